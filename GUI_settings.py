@@ -2,11 +2,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Dict, Any, Callable, List, Optional, Tuple
 import threading
+import datetime
 
 # Import the updater module
 import updater
 # Import bug report module
 import bug_report
+from theme_styles import apply_style_set
+from construction_store import display_name
+from site_archive import latest_records
 
 class SettingsWindow:
     """Class that handles the settings window for Architect Tracker plugin."""
@@ -22,7 +26,10 @@ class SettingsWindow:
                  hide_provided: bool,
                  sort_by_system: bool,
                  cargo_capacity: int,
-                 data: Dict,
+                 station_index_provider: Callable[[], Dict[str, List[Tuple[str, str]]]],
+                 archive_provider: Callable[[], List[Dict[str, Any]]],
+                 carriers_provider: Callable[[], List[Tuple[str, str, bool]]],
+                 auto_archive_days: int,
                  
                  # Callback functions
                  toggle_column_callback: Callable[[str, bool], None],
@@ -30,6 +37,9 @@ class SettingsWindow:
                  toggle_sort_mode_callback: Callable[[], None],
                  update_cargo_capacity_callback: Callable[[int], None],
                  remove_station_callback: Callable[[str], None],
+                 restore_site_callback: Callable[[Dict[str, Any]], None],
+                 select_carrier_callback: Callable[[str, bool], None],
+                 update_auto_archive_days_callback: Callable[[int], None],
                  change_theme_callback: Callable[[int], None],
                  change_materials_theme_callback: Callable[[int], None]):
         """
@@ -44,12 +54,19 @@ class SettingsWindow:
             hide_provided: Whether to hide fully provided materials
             sort_by_system: Whether to sort stations by system
             cargo_capacity: Ship cargo capacity in tons
-            data: Dictionary containing station data
+            station_index_provider: Returns the main window's station index
+                (system name -> sorted list of (display name, station key))
+            archive_provider: Returns the archive records (completed, stale and restored sites), oldest first
+            carriers_provider: Returns the known carriers as (callsign, name, selected)
+            auto_archive_days: Days without updates after which a site is archived (0 = never)
             toggle_column_callback: Callback for toggling column visibility
             toggle_hide_provided_callback: Callback for toggling hide provided setting
             toggle_sort_mode_callback: Callback for toggling sort mode
             update_cargo_capacity_callback: Callback for updating cargo capacity
             remove_station_callback: Callback for removing a station
+            restore_site_callback: Callback for restoring an archived site
+            select_carrier_callback: Callback for including or excluding a carrier from Carrier Qty
+            update_auto_archive_days_callback: Callback for changing auto_archive_days
             change_theme_callback: Callback for changing theme
             change_materials_theme_callback: Callback for changing materials theme
         """
@@ -59,6 +76,7 @@ class SettingsWindow:
         self.THEME_COLORS = theme_constants["THEME_COLORS"]
         self.THEME_BLACK = theme_constants["THEME_BLACK"]
         self.THEME_WHITE = theme_constants["THEME_WHITE"]
+        self.THEME_STYLE_PREFIX = theme_constants["THEME_STYLE_PREFIX"]
         
         # Store current settings
         self.current_theme = current_theme
@@ -67,7 +85,12 @@ class SettingsWindow:
         self.hide_provided = hide_provided
         self.sort_by_system = sort_by_system
         self.cargo_capacity = cargo_capacity
-        self.data = data
+        self.station_index_provider = station_index_provider
+        self.archive_provider = archive_provider
+        self.carriers_provider = carriers_provider
+        self.auto_archive_days = auto_archive_days
+        self.archive_rows = {}  # archive tree item id -> archive record
+        self.remove_station_map = {}  # Map display names to full station keys
         
         # Store callback functions
         self.toggle_column_callback = toggle_column_callback
@@ -75,6 +98,9 @@ class SettingsWindow:
         self.toggle_sort_mode_callback = toggle_sort_mode_callback
         self.update_cargo_capacity_callback = update_cargo_capacity_callback
         self.remove_station_callback = remove_station_callback
+        self.restore_site_callback = restore_site_callback
+        self.select_carrier_callback = select_carrier_callback
+        self.update_auto_archive_days_callback = update_auto_archive_days_callback
         self.change_theme_callback = change_theme_callback
         self.change_materials_theme_callback = change_materials_theme_callback
         
@@ -83,15 +109,17 @@ class SettingsWindow:
         self.create_window()
     
     def create_window(self):
-        """Create and show the settings window."""
-        # Close existing window if open
+        """Create the settings window, or show it again if it was only hidden."""
         if self.window and self.window.winfo_exists():
-            self.window.destroy()
+            self.show()
+            return
             
         # Create new settings window with proper theme
         self.window = tk.Toplevel(self.parent)
         self.window.transient(self.parent)
         self.window.title("Settings")
+        # Closing only hides the window so it can be reused on the next open
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
         
         # Apply current theme to the settings window
         theme_colors = self.THEME_COLORS[self.current_theme]
@@ -101,25 +129,108 @@ class SettingsWindow:
         self.notebook = ttk.Notebook(self.window)
         self.notebook.pack(fill="both", expand=True, padx=5, pady=5)
         
-        # Create three tabs: Display Settings, Theme Settings, and Station Management
+        # Create empty tab frames; their contents are built when first selected
         self.display_tab = ttk.Frame(self.notebook, style="Main.TFrame")
         self.theme_tab = ttk.Frame(self.notebook, style="Main.TFrame")
         self.station_tab = ttk.Frame(self.notebook, style="Main.TFrame")
+        self.completed_tab = ttk.Frame(self.notebook, style="Main.TFrame")
+        self.carriers_tab = ttk.Frame(self.notebook, style="Main.TFrame")
+        self.update_tab = ttk.Frame(self.notebook, style="Main.TFrame")
+        self.info_tab = ttk.Frame(self.notebook, style="Main.TFrame")
         
         # Add tabs to the notebook
         self.notebook.add(self.display_tab, text="Display Settings")
         self.notebook.add(self.theme_tab, text="Theme")
         self.notebook.add(self.station_tab, text="Station Management")
-        
-        # Create a fourth tab for Updates
-        self.update_tab = ttk.Frame(self.notebook, style="Main.TFrame")
+        self.notebook.add(self.completed_tab, text="Archive")
+        self.notebook.add(self.carriers_tab, text="Carriers")
         self.notebook.add(self.update_tab, text="Updates")
-        
-        # Create a fifth tab for Info
-        self.info_tab = ttk.Frame(self.notebook, style="Main.TFrame")
         self.notebook.add(self.info_tab, text="Info")
         
-        # --------- INFO TAB ---------
+        # Map tab frame names to the functions that fill them in
+        self.tab_builders = {
+            str(self.display_tab): self._build_display_tab,
+            str(self.theme_tab): self._build_theme_tab,
+            str(self.station_tab): self._build_station_tab,
+            str(self.completed_tab): self._build_completed_tab,
+            str(self.carriers_tab): self._build_carriers_tab,
+            str(self.update_tab): self._build_update_tab,
+            str(self.info_tab): self._build_info_tab,
+        }
+        self.built_tabs = set()
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self._build_selected_tab())
+        self._build_selected_tab()
+        
+        # Make sure the window is not too small
+        self.window.minsize(400, 450)
+        self._center_over_parent()
+
+    def _build_selected_tab(self):
+        """Build the contents of the currently selected tab if not built yet."""
+        tab_name = self.notebook.select()
+        if not tab_name or tab_name in self.built_tabs:
+            return
+        builder = self.tab_builders.get(tab_name)
+        if builder:
+            self.built_tabs.add(tab_name)
+            builder()
+            # New widgets start on the generic styles; point them at the theme's style set
+            apply_style_set(self.notebook.nametowidget(tab_name), self.THEME_STYLE_PREFIX[self.current_theme])
+
+    def _center_over_parent(self):
+        """Position the settings window over the parent window."""
+        self.window.update_idletasks()
+        px = self.parent.winfo_x()
+        py = self.parent.winfo_y() 
+        pw = self.parent.winfo_width()
+        ph = self.parent.winfo_height()
+        sw = self.window.winfo_width()
+        sh = self.window.winfo_height()
+        x = px + (pw - sw) // 2
+        y = py + (ph - sh) // 2
+        self.window.geometry(f"+{x}+{y}")
+
+    def show(self):
+        """Show a previously hidden settings window."""
+        if not self.window or not self.window.winfo_exists():
+            self.create_window()
+            return
+        self.update_theme()
+        self.refresh_stations()
+        self.refresh_archive()
+        self.refresh_carriers()
+        self.window.deiconify()
+        self._center_over_parent()
+        self.window.lift()
+
+    def hide(self):
+        """Hide the settings window without destroying it."""
+        if self.window and self.window.winfo_exists():
+            self.window.withdraw()
+
+    def sync_settings(self, current_theme: int, materials_theme: int,
+                      column_visibility: Dict[str, bool], hide_provided: bool,
+                      sort_by_system: bool, cargo_capacity: int):
+        """Update the stored settings and any already built controls from the main window."""
+        self.current_theme = current_theme
+        self.materials_theme = materials_theme
+        self.column_visibility = column_visibility
+        self.hide_provided = hide_provided
+        self.sort_by_system = sort_by_system
+        self.cargo_capacity = cargo_capacity
+        
+        if str(self.display_tab) in self.built_tabs:
+            for col, var in self.column_vars.items():
+                var.set(self.column_visibility.get(col, True))
+            self.hide_var.set(self.hide_provided)
+            self.sort_var.set(self.sort_by_system)
+            self.cargo_var.set(str(self.cargo_capacity))
+        if str(self.theme_tab) in self.built_tabs:
+            self.theme_var.set(self.current_theme)
+            self.materials_theme_var.set(self.materials_theme)
+
+    def _build_info_tab(self):
+        """Build the Info tab."""
         # Add title
         ttk.Label(self.info_tab, 
                   text="Architect Tracker", 
@@ -138,8 +249,9 @@ class SettingsWindow:
         ttk.Label(self.info_tab,
                   text=version_text,
                   style="TLabel").pack(anchor="center", padx=10, pady=(5, 20))
-        
-        # --------- UPDATES TAB ---------
+
+    def _build_update_tab(self):
+        """Build the Updates tab."""
         ttk.Label(self.update_tab, text=f"Current Version: {updater.get_current_version()}", style="TLabel").pack(anchor="w", padx=10, pady=(10, 5))
 
         # Create frame for update controls
@@ -175,11 +287,13 @@ class SettingsWindow:
 
         self.status_label = ttk.Label(self.progress_frame, text="", style="TLabel")
         self.status_label.pack(anchor="w", pady=5)
-        
-        # --------- DISPLAY SETTINGS TAB ---------
+
+    def _build_display_tab(self):
+        """Build the Display Settings tab."""
         ttk.Label(self.display_tab, text="Select columns to display:", style="TLabel").pack(padx=10, pady=5, anchor="w")
         
         # Column visibility checkboxes
+        self.column_vars = {}
         for idx, (col, visible) in enumerate(self.column_visibility.items()):
             var = tk.BooleanVar(value=visible)
             if idx == 0:
@@ -199,6 +313,7 @@ class SettingsWindow:
                     command=lambda c=col, v=var: self.toggle_column(c, v.get()),
                     style="TCheckbutton"
                 )
+                self.column_vars[col] = var
             chk.pack(anchor="w", padx=10)
             
         # Add gameplay settings to Display tab
@@ -238,8 +353,9 @@ class SettingsWindow:
         cargo_entry.pack(side="left", padx=(0, 5))
         
         ttk.Button(cargo_frame, text="Apply", command=self.update_cargo_capacity, style="TButton").pack(side="left")
-        
-        # --------- THEME SETTINGS TAB ---------
+
+    def _build_theme_tab(self):
+        """Build the Theme tab."""
         # Main window theme selection
         ttk.Label(self.theme_tab, text="Main window theme:", style="TLabel").pack(anchor="w", padx=10, pady=(10, 5))
         
@@ -297,9 +413,8 @@ class SettingsWindow:
             style="TRadiobutton"
         ).pack(anchor="w", padx=5, pady=2)
 
-        # --------- STATION MANAGEMENT TAB ---------
-
-        # --------- STATION MANAGEMENT TAB ---------
+    def _build_station_tab(self):
+        """Build the Station Management tab."""
         ttk.Label(self.station_tab, text="Remove station from tracking:", style="TLabel").pack(anchor="w", padx=10, pady=(10, 5))
         
         # System selection for filtering stations
@@ -307,18 +422,9 @@ class SettingsWindow:
         system_frame.pack(anchor="w", padx=10, pady=(5, 5), fill="x")
         ttk.Label(system_frame, text="System:", style="TLabel").pack(side="left", padx=(0, 5))
         
-        # Extract all unique system names from the data
-        systems = set()
-        for info in self.data.values():
-            system_name = info.get('system', 'Unknown')
-            if system_name:
-                systems.add(system_name)
-        
         # Prepare system dropdown
         self.system_var = tk.StringVar(value="All Systems")  # Default to "All Systems"
         self.system_dropdown = ttk.Combobox(system_frame, textvariable=self.system_var, state="readonly", width=25)
-        system_values = ["All Systems"] + sorted(list(systems))
-        self.system_dropdown['values'] = system_values
         self.system_dropdown.pack(side="left", padx=(0, 5))
         self.system_dropdown.bind("<<ComboboxSelected>>", lambda e: self.filter_stations_by_system())
         
@@ -334,28 +440,145 @@ class SettingsWindow:
         # Remove button
         ttk.Button(removal_frame, text="Remove", command=self.remove_station, style="TButton").pack(side="left")
         
-        # Prepare the mapping from display names to full station keys
-        self.remove_station_map = {}  # Map display names to full station keys
-        self.system_station_data = {}  # Store station data by system for filtering
+        # Initialize the dropdowns from the main window's station index
+        self.refresh_stations()
+
+    def _build_carriers_tab(self):
+        """Build the Carriers tab."""
+        ttk.Label(self.carriers_tab, text="Carriers counted in the Carrier Qty column:",
+                  style="TLabel").pack(anchor="w", padx=10, pady=(10, 5))
+        self.carrier_list_frame = ttk.Frame(self.carriers_tab, style="Main.TFrame")
+        self.carrier_list_frame.pack(anchor="w", padx=10, pady=5, fill="x")
+        self.refresh_carriers()
+
+    def refresh_carriers(self):
+        """Rebuild the carrier checkboxes from the main window's carrier registry."""
+        if str(self.carriers_tab) not in self.built_tabs:
+            return
+        for child in self.carrier_list_frame.winfo_children():
+            child.destroy()
+        self.carrier_vars = {}
+        carriers = self.carriers_provider()
+        if not carriers:
+            ttk.Label(self.carrier_list_frame, text="No carriers yet. Open Carrier Management in game.",
+                      style="TLabel").pack(anchor="w")
+        for callsign, name, selected in carriers:
+            var = tk.BooleanVar(value=selected)
+            self.carrier_vars[callsign] = var
+            ttk.Checkbutton(self.carrier_list_frame, text=f"{name} ({callsign})", variable=var,
+                            command=lambda c=callsign, v=var: self.select_carrier_callback(c, v.get()),
+                            style="TCheckbutton").pack(anchor="w", pady=2)
+        apply_style_set(self.carrier_list_frame, self.THEME_STYLE_PREFIX[self.current_theme])
+
+    def _build_completed_tab(self):
+        """Build the Archive tab (completed and inactive construction sites)."""
+        # Auto-archive policy
+        policy_frame = ttk.Frame(self.completed_tab, style="Main.TFrame")
+        policy_frame.pack(anchor="w", padx=10, pady=(10, 5), fill="x")
+        ttk.Label(policy_frame, text="Archive sites not updated for", style="TLabel").pack(side="left")
+        self.archive_days_var = tk.StringVar(value=str(self.auto_archive_days))
+        ttk.Entry(policy_frame, textvariable=self.archive_days_var, width=5, style="TEntry").pack(side="left", padx=5)
+        ttk.Label(policy_frame, text="days (0 = never)", style="TLabel").pack(side="left")
+        ttk.Button(policy_frame, text="Apply", command=self.update_auto_archive_days, style="TButton").pack(side="left", padx=(10, 0))
+
+        self.archive_count_label = ttk.Label(self.completed_tab, text="", style="TLabel")
+        self.archive_count_label.pack(anchor="w", padx=10, pady=(5, 5))
+
+        tree_frame = ttk.Frame(self.completed_tab, style="Main.TFrame")
+        tree_frame.pack(fill="both", expand=True, padx=10, pady=(0, 5))
+        columns = ("Station", "System", "Status", "Started", "Archived", "Duration", "Tonnes")
+        self.archive_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=12)
+        for col in columns:
+            self.archive_tree.heading(col, text=col)
+            self.archive_tree.column(col, width=70 if col in ("Status", "Duration", "Tonnes") else 110, anchor="w")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.archive_tree.yview)
+        self.archive_tree.configure(yscrollcommand=scrollbar.set)
+        self.archive_tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        ttk.Button(self.completed_tab, text="Restore selected", command=self.restore_site,
+                   style="TButton").pack(anchor="w", padx=10, pady=(0, 10))
+
+        # The archive file is only read once this tab is opened
+        self.refresh_archive()
+
+    @staticmethod
+    def _format_time(timestamp):
+        if not timestamp:
+            return "?"
+        return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+    @staticmethod
+    def _format_duration(seconds):
+        if seconds is None:
+            return "?"
+        hours, rest = divmod(int(seconds), 3600)
+        days, hours = divmod(hours, 24)
+        if days:
+            return f"{days}d {hours}h"
+        return f"{hours}h {rest // 60}m"
+
+    def refresh_archive(self):
+        """Reload the Archive tab, newest first."""
+        if str(self.completed_tab) not in self.built_tabs:
+            return
+        records = latest_records(self.archive_provider())
+        self.archive_tree.delete(*self.archive_tree.get_children())
+        self.archive_rows = {}
+        for record in records:
+            item = self.archive_tree.insert("", "end", values=(
+                display_name(record.get("name", "")),
+                record.get("system") or "",
+                "Completed" if record.get("reason") == "completed" else "Inactive",
+                self._format_time(record.get("started")),
+                self._format_time(record.get("finished")),
+                self._format_duration(record.get("duration")),
+                record.get("total_tonnes", 0),
+            ))
+            self.archive_rows[item] = record
+        completed = sum(1 for r in records if r.get("reason") == "completed")
+        self.archive_count_label["text"] = (f"Completed construction sites: {completed}, "
+                                            f"inactive: {len(records) - completed}")
+
+    def restore_site(self):
+        """Restore the selected inactive site to tracking."""
+        record = self.archive_rows.get(next(iter(self.archive_tree.selection()), None))
+        if not record:
+            messagebox.showwarning("Warning", "Please select a site to restore", parent=self.window)
+            return
+        if record.get("reason") == "completed":
+            messagebox.showinfo("Info", "This site was completed and cannot be restored.", parent=self.window)
+            return
+        # The main window refreshes its station index and then our dropdowns
+        self.restore_site_callback(record)
+        self.refresh_archive()
+
+    def update_auto_archive_days(self):
+        """Change the auto-archive policy in the main window."""
+        try:
+            days = max(0, int(self.archive_days_var.get()))
+        except ValueError:
+            self.archive_days_var.set(str(self.auto_archive_days))
+            return
+        self.auto_archive_days = days
+        self.archive_days_var.set(str(days))
+        self.update_auto_archive_days_callback(days)
+        self.refresh_archive()
+
+    def refresh_stations(self):
+        """Reload the station dropdowns from the main window's station index."""
+        if str(self.station_tab) not in self.built_tabs:
+            return
+        station_index = self.station_index_provider()
         
-        # Initialize the station dropdown with all stations
-        self.update_station_data()
-        self.filter_stations_by_system()
+        # Map display names to full station keys
+        self.remove_station_map = {name: key for name, key in station_index.get("All Systems", [])}
         
-        # Position settings window over parent
-        self.window.update_idletasks()
-        px = self.parent.winfo_x()
-        py = self.parent.winfo_y() 
-        pw = self.parent.winfo_width()
-        ph = self.parent.winfo_height()
-        sw = self.window.winfo_width()
-        sh = self.window.winfo_height()
-        x = px + (pw - sw) // 2
-        y = py + (ph - sh) // 2
-        self.window.geometry(f"+{x}+{y}")
-        
-        # Make sure the window is not too small
-        self.window.minsize(400, 450)
+        system_values = ["All Systems"] + sorted(s for s in station_index if s != "All Systems")
+        self.system_dropdown['values'] = system_values
+        if self.system_var.get() not in system_values:
+            self.system_var.set("All Systems")
+        self.filter_stations_by_system()
 
     def toggle_column(self, column, is_visible: bool):
         """Toggle column visibility in the main window."""
@@ -388,42 +611,12 @@ class SettingsWindow:
             self.cargo_var.set(str(self.cargo_capacity))
             print("Settings window - Invalid cargo capacity value provided")
             
-    def update_station_data(self):
-        """Update the internal station data structure for filtering."""
-        self.remove_station_map = {}  # Map display names to full station keys
-        self.system_station_data = {"All Systems": []}  # Store station data by system
-        
-        for station_key, info in self.data.items():
-            # Use same display format as main UI
-            display_name = (station_key.split(':', 1)[-1].strip() if ':' in station_key else 
-                           station_key.split(';', 1)[-1].strip() if ';' in station_key else station_key)
-            system_name = info.get('system', 'Unknown')
-            
-            # Use display name without system in dropdown for cleaner display
-            display_text = display_name
-            
-            # Store data by system for filtering
-            if system_name not in self.system_station_data:
-                self.system_station_data[system_name] = []
-            
-            # Add to the system-specific list
-            self.system_station_data[system_name].append((display_text, station_key))
-            
-            # Also add to the "All Systems" list
-            self.system_station_data["All Systems"].append((display_text, station_key))
-            
-            # Update the mapping
-            self.remove_station_map[display_text] = station_key
-    
     def filter_stations_by_system(self):
         """Filter stations by the selected system."""
         selected_system = self.system_var.get()
         
-        # Get stations for the selected system
-        station_data = self.system_station_data.get(selected_system, [])
-        
-        # Sort stations alphabetically
-        station_data.sort(key=lambda x: x[0])
+        # Station lists in the index are already sorted alphabetically
+        station_data = self.station_index_provider().get(selected_system, [])
         
         # Update dropdown values
         station_values = [name for name, _ in station_data]
@@ -432,21 +625,16 @@ class SettingsWindow:
         # Select first item if available
         if station_values:
             self.remove_station_dropdown.current(0)
+        else:
+            self.remove_station_var.set("")
             
     def remove_station(self):
         """Remove a station from tracking."""
         selected = self.remove_station_var.get()
         if selected and selected in self.remove_station_map:
             station_key = self.remove_station_map[selected]
+            # The main window refreshes its station index and then our dropdowns
             self.remove_station_callback(station_key)
-            
-            # Update our internal data structures
-            if station_key in self.data:
-                del self.data[station_key]
-                
-            # Refresh the station dropdowns
-            self.update_station_data()
-            self.filter_stations_by_system()
     
     def change_theme(self):
         """Change the main window theme."""
@@ -479,8 +667,9 @@ class SettingsWindow:
         # Get theme colors for current theme
         theme_colors = self.THEME_COLORS[self.current_theme]
         
-        # Update settings window background
+        # Update settings window background and re-point widgets at the theme's style set
         self.window.configure(bg=theme_colors["background"])
+        apply_style_set(self.window, self.THEME_STYLE_PREFIX[self.current_theme])
     
     def check_for_updates(self):
         """Check for available updates from GitHub."""
@@ -494,7 +683,8 @@ class SettingsWindow:
         
         # Use threading to avoid freezing the UI
         def _check_worker():
-            success, result = updater.get_available_releases()
+            # A manual check skips the cache TTL but still sends a conditional request
+            success, result = updater.get_available_releases(force_revalidate=True)
             
             # Update UI in the main thread
             self.window.after(0, lambda: self._process_update_check_result(success, result))
@@ -585,11 +775,11 @@ class SettingsWindow:
         self.update_button.configure(state="disabled")
         self.version_dropdown.configure(state="disabled")
         
-        # Start the update
+        # Start the update; the callbacks run on the worker thread, so hand them to Tk's event loop
         updater.download_and_install_update(
             release_data,
-            progress_callback=self._update_progress,
-            completion_callback=self._update_complete
+            progress_callback=lambda progress, message: self.window.after(0, self._update_progress, progress, message),
+            completion_callback=lambda success, message: self.window.after(0, self._update_complete, success, message)
         )
 
     def _update_progress(self, progress, message):
@@ -624,5 +814,6 @@ class SettingsWindow:
         """Show the bug report dialog."""
         # Get theme colors for current theme to pass to the bug report dialog
         theme_colors = self.THEME_COLORS[self.current_theme]
-        bug_report.show_bug_report_dialog(self.window, theme_colors)
+        dialog = bug_report.show_bug_report_dialog(self.window, theme_colors)
+        apply_style_set(dialog, self.THEME_STYLE_PREFIX[self.current_theme])
 
@@ -4,14 +4,19 @@ import json
 import platform
 import sys
 import os
-import requests
 import logging
+from contextlib import suppress
 import datetime
 import threading
-from typing import Callable, Optional, Dict, Any
+import time
+import uuid
+from typing import Callable, Optional, Dict, Any, List, Tuple
 
 # Import the updater to get version info
 import updater
+import http_client
+import diagnostics
+from settings import USER_DIR, write_json_atomic
 
 # Configure logger
 logger = logging.getLogger("ArchitectTracker.BugReport")
@@ -19,6 +24,24 @@ logger = logging.getLogger("ArchitectTracker.BugReport")
 # Discord webhook URL
 DISCORD_WEBHOOK_URL = "https://discord.com/api/webhooks/1373770213098524904/qqZEXP80Q5Z5A46BqeIHLi6lJlseIlKVFODMnlngEJac3RQDRjeQqbMnXTuEzhBMxoqy"
 
+# Reports waiting to be sent, one JSON file each
+OUTBOX_DIR = os.path.join(USER_DIR, "bug_outbox")
+# Discord webhook limits for coalescing several reports into one message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_MESSAGE_CHARS = 6000
+MAX_DESCRIPTION_CHARS = 4000
+# Delay between delivery attempts while offline (doubles up to the maximum)
+OUTBOX_RETRY_MIN = 60  # seconds
+OUTBOX_RETRY_MAX = 60 * 60  # seconds
+# A sender claims the reports it is sending by renaming them to <base>.sending;
+# claims older than this were left by a sender that died and are queued again
+CLAIM_TIMEOUT = 10 * 60  # seconds
+
+# Background sender state
+_sender_thread = None
+_sender_lock = threading.Lock()
+_sender_wake = threading.Event()
+
 class BugReportDialog(tk.Toplevel):
     """Dialog for collecting bug report information from users."""
     
@@ -77,6 +100,18 @@ class BugReportDialog(tk.Toplevel):
                       text="Include system information", 
                       variable=self.include_system_info).pack(anchor="w", pady=(5, 10))
         
+        # Optional diagnostics bundle, built in the background and previewable
+        diag_frame = ttk.Frame(frame)
+        diag_frame.pack(fill=tk.X, pady=(0, 10))
+        self.include_diagnostics = tk.BooleanVar(value=False)
+        ttk.Checkbutton(diag_frame, 
+                      text="Attach diagnostics (timings, file sizes, recent log)", 
+                      variable=self.include_diagnostics,
+                      command=self._on_diagnostics_toggled).pack(side=tk.LEFT)
+        ttk.Button(diag_frame, text="Preview", command=self.preview_diagnostics).pack(side=tk.RIGHT)
+        self.diagnostics_bundle = None  # (preview text, compressed bytes) once built
+        self.diagnostics_building = False
+        
         # Version info (always included, not optional)
         version_frame = ttk.Frame(frame)
         version_frame.pack(fill=tk.X, pady=(5, 15))
@@ -119,8 +154,61 @@ class BugReportDialog(tk.Toplevel):
             logger.error(f"Error gathering system info: {e}")
             return {"Error": f"Failed to gather system information: {e}"}
     
+    def _on_diagnostics_toggled(self):
+        """Start building the diagnostics bundle as soon as it is requested."""
+        if self.include_diagnostics.get() and not self.diagnostics_bundle:
+            self._build_diagnostics()
+    
+    def _build_diagnostics(self, on_ready: Optional[Callable[[], None]] = None):
+        """Build the diagnostics bundle in a background thread."""
+        if self.diagnostics_building:
+            return
+        self.diagnostics_building = True
+        
+        def _worker():
+            try:
+                bundle = diagnostics.build_bundle()
+            except Exception as e:
+                logger.error(f"Error building diagnostics bundle: {e}")
+                bundle = (f"Failed to build diagnostics: {e}", None)
+            
+            def _done():
+                self.diagnostics_bundle = bundle
+                self.diagnostics_building = False
+                if on_ready:
+                    on_ready()
+            
+            with suppress(tk.TclError, RuntimeError):
+                self.after(0, _done)
+        
+        threading.Thread(target=_worker, daemon=True).start()
+    
+    def preview_diagnostics(self):
+        """Show the diagnostics bundle that would be attached."""
+        if not self.diagnostics_bundle:
+            self._build_diagnostics(on_ready=self.preview_diagnostics)
+            return
+        
+        preview_text, compressed = self.diagnostics_bundle
+        preview = tk.Toplevel(self)
+        preview.title("Diagnostics Preview")
+        preview.transient(self)
+        
+        size_text = f"Compressed size: {len(compressed) / 1024:.1f} KB" if compressed else "Not available"
+        ttk.Label(preview, text=size_text).pack(anchor="w", padx=10, pady=(10, 5))
+        
+        text_frame = ttk.Frame(preview)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        scrollbar = ttk.Scrollbar(text_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text = tk.Text(text_frame, height=25, width=90, wrap=tk.NONE, yscrollcommand=scrollbar.set)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=text.yview)
+        text.insert(tk.END, preview_text)
+        text.config(state=tk.DISABLED)
+    
     def submit_report(self):
-        """Submit the bug report to Discord webhook."""
+        """Queue the bug report for delivery to the Discord webhook."""
         # Validate inputs
         title = self.title_var.get().strip()
         description = self.desc_text.get("1.0", tk.END).strip()
@@ -139,13 +227,6 @@ class BugReportDialog(tk.Toplevel):
                                   parent=self):
             return
         
-        # Disable inputs during submission
-        self.title_var.set("Submitting report...")
-        self.desc_text.config(state=tk.DISABLED)
-        for widget in self.winfo_children():
-            if isinstance(widget, ttk.Button):
-                widget.config(state=tk.DISABLED)
-        
         # Create report data
         report_data = {
             "title": title,
@@ -158,80 +239,290 @@ class BugReportDialog(tk.Toplevel):
         if self.include_system_info.get():
             report_data["system_info"] = self.get_system_info()
         
-        # Submit in background thread
-        threading.Thread(target=self._submit_report_thread, 
-                        args=(report_data,), 
-                        daemon=True).start()
-    
-    def _submit_report_thread(self, report_data: Dict[str, Any]):
-        """Thread function to submit the report to Discord."""
+        # Queue the report on disk; the background sender delivers it when online
         try:
-            # Create Discord embed
-            embed = {
-                "title": f"Bug Report: {report_data['title']}",
-                "description": report_data['description'],
-                "color": 15105570,  # Orange color (decimal value)
-                "timestamp": report_data['timestamp'],
-                "fields": [
-                    {
-                        "name": "Version",
-                        "value": report_data['version'],
-                        "inline": True
-                    }
-                ],
-                "footer": {
-                    "text": "Architect Tracker Bug Report"
-                }
-            }
-            
-            # Add system info if included
-            if report_data.get("include_system_info", False) and "system_info" in report_data:
-                system_info_text = "\n".join([f"{k}: {v}" for k, v in report_data["system_info"].items()])
-                embed["fields"].append({
-                    "name": "System Information",
-                    "value": f"```\n{system_info_text}\n```",
-                    "inline": False
-                })
-            
-            # Prepare webhook payload
-            payload = {
-                "content": f"New bug report from Architect Tracker",
-                "embeds": [embed]
-            }
-            
-            # Send to Discord
-            response = requests.post(DISCORD_WEBHOOK_URL, 
-                                    json=payload,
-                                    headers={"Content-Type": "application/json"},
-                                    timeout=10)
-            response.raise_for_status()
-            
-            # Handle success in main thread
-            self.after(0, lambda: self._handle_submission_success())
-            
+            if self.include_diagnostics.get():
+                if self.diagnostics_bundle and self.diagnostics_bundle[1]:
+                    queue_report(report_data, attachment=self.diagnostics_bundle[1])
+                else:
+                    # Not built yet; build it and queue the report in the background
+                    threading.Thread(target=_queue_with_diagnostics, 
+                                    args=(report_data,), 
+                                    daemon=True).start()
+            else:
+                queue_report(report_data)
         except Exception as e:
-            logger.error(f"Error submitting bug report: {e}")
-            # Handle error in main thread
-            self.after(0, lambda: self._handle_submission_error(str(e)))
-    
-    def _handle_submission_success(self):
-        """Handle successful submission in the main thread."""
+            logger.error(f"Error queueing bug report: {e}")
+            messagebox.showerror("Error", 
+                               f"Failed to save bug report: {e}", 
+                               parent=self)
+            return
+        
         messagebox.showinfo("Success", 
-                          "Your bug report has been submitted successfully. Thank you!", 
+                          "Your bug report has been saved and will be sent in the background. Thank you!", 
                           parent=self)
         self.destroy()
+
+def _build_embed(report_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Create the Discord embed for a bug report."""
+    embed = {
+        "title": f"Bug Report: {report_data['title']}"[:256],
+        "description": report_data['description'][:MAX_DESCRIPTION_CHARS],
+        "color": 15105570,  # Orange color (decimal value)
+        "timestamp": report_data['timestamp'],
+        "fields": [
+            {
+                "name": "Version",
+                "value": report_data['version'],
+                "inline": True
+            }
+        ],
+        "footer": {
+            "text": "Architect Tracker Bug Report"
+        }
+    }
+    
+    # Add system info if included
+    if report_data.get("include_system_info", False) and "system_info" in report_data:
+        system_info_text = "\n".join([f"{k}: {v}" for k, v in report_data["system_info"].items()])
+        embed["fields"].append({
+            "name": "System Information",
+            "value": f"```\n{system_info_text}\n```"[:1024],
+            "inline": False
+        })
+    
+    if report_data.get("attachment"):
+        embed["fields"].append({
+            "name": "Diagnostics",
+            "value": f"Attached: {report_data['attachment']}",
+            "inline": False
+        })
+    return embed
+
+def _embed_length(embed: Dict[str, Any]) -> int:
+    """Count the characters Discord includes in its per-message embed limit."""
+    length = len(embed["title"]) + len(embed["description"]) + len(embed["footer"]["text"])
+    for field in embed["fields"]:
+        length += len(field["name"]) + len(field["value"])
+    return length
+
+def queue_report(report_data: Dict[str, Any], attachment: Optional[bytes] = None):
+    """
+    Atomically add a report to the on-disk outbox and wake the sender.
+    
+    Args:
+        report_data (dict): Report fields
+        attachment (bytes): Optional compressed diagnostics bundle
+    """
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    base_name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
     
-    def _handle_submission_error(self, error_message: str):
-        """Handle submission error in the main thread."""
-        messagebox.showerror("Error", 
-                           f"Failed to submit bug report: {error_message}\n\nPlease try again later.", 
-                           parent=self)
-        # Re-enable inputs
-        self.title_var.set(self.title_var.get().replace("Submitting report...", ""))
-        self.desc_text.config(state=tk.NORMAL)
-        for widget in self.winfo_children():
-            if isinstance(widget, ttk.Button):
-                widget.config(state=tk.NORMAL)
+    # Write the attachment first so the sender never sees a report without it
+    if attachment is not None:
+        attachment_name = f"{base_name}.diag.json.gz"
+        attachment_path = os.path.join(OUTBOX_DIR, attachment_name)
+        with open(attachment_path + ".tmp", "wb") as f:
+            f.write(attachment)
+        os.replace(attachment_path + ".tmp", attachment_path)
+        report_data = dict(report_data, attachment=attachment_name)
+    
+    write_json_atomic(os.path.join(OUTBOX_DIR, f"{base_name}.json"), report_data)
+    logger.info(f"Bug report queued as {base_name}")
+    start_outbox_sender()
+
+def _queue_with_diagnostics(report_data: Dict[str, Any]):
+    """Build a diagnostics bundle and queue the report with it (background thread)."""
+    try:
+        _, attachment = diagnostics.build_bundle()
+    except Exception as e:
+        logger.error(f"Error building diagnostics bundle, sending report without it: {e}")
+        attachment = None
+    try:
+        queue_report(report_data, attachment=attachment)
+    except Exception as e:
+        logger.error(f"Error queueing bug report: {e}")
+
+def pending_reports() -> List[str]:
+    """Return the paths of queued reports, oldest first."""
+    try:
+        filenames = sorted(f for f in os.listdir(OUTBOX_DIR) if f.endswith(".json"))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(OUTBOX_DIR, f) for f in filenames]
+
+def _claim_report(path: str) -> Optional[str]:
+    """
+    Take a queued report for sending, so no other EDMC instance sends it too.
+
+    Returns:
+        str: Path of the claimed report, None if another sender claimed it first
+    """
+    claimed_path = os.path.splitext(path)[0] + ".sending"
+    try:
+        os.rename(path, claimed_path)
+    except OSError:
+        return None
+    with suppress(OSError):
+        os.utime(claimed_path)  # the claim's age counts from now
+    return claimed_path
+
+def _release_report(claimed_path: str):
+    """Put a claimed report back into the queue."""
+    try:
+        os.rename(claimed_path, os.path.splitext(claimed_path)[0] + ".json")
+    except OSError as e:
+        logger.error(f"Failed to requeue bug report {os.path.basename(claimed_path)}: {e}")
+
+def _reclaim_stale_claims(now: Optional[float] = None):
+    """Requeue reports claimed by a sender that stopped before finishing them."""
+    cutoff = (time.time() if now is None else now) - CLAIM_TIMEOUT
+    try:
+        filenames = [f for f in os.listdir(OUTBOX_DIR) if f.endswith(".sending")]
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        path = os.path.join(OUTBOX_DIR, filename)
+        with suppress(FileNotFoundError):
+            if os.path.getmtime(path) < cutoff:
+                logger.info(f"Requeueing abandoned bug report {filename}")
+                _release_report(path)
+
+def _reject_report(path: str, reason: str):
+    """Move a report that can never be delivered, and its diagnostics attachment, out of the queue."""
+    logger.error(f"Dropping bug report {os.path.basename(path)} from the outbox: {reason}")
+    base_path = os.path.splitext(path)[0]  # queued (.json) or claimed (.sending)
+    try:
+        os.replace(path, base_path + ".rejected")
+    except OSError as e:
+        logger.error(f"Failed to move rejected bug report: {e}")
+    # The attachment name follows from the report's (see queue_report), even if the report is unreadable
+    attachment_path = base_path + ".diag.json.gz"
+    if os.path.exists(attachment_path):
+        try:
+            os.replace(attachment_path, base_path + ".diag.rejected.gz")
+        except OSError as e:
+            logger.error(f"Failed to move rejected bug report attachment: {e}")
+
+def _next_batch(paths: List[str], max_reports: int) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """Claim queued reports and coalesce as many as fit into one webhook message.
+    
+    Reports another sender has claimed are skipped.
+    
+    Returns:
+        list: (claimed report path, embed, attachment path or None) per report
+    """
+    batch = []
+    total_length = 0
+    for queued_path in paths:
+        if len(batch) >= max_reports:
+            break
+        path = _claim_report(queued_path)
+        if path is None:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                report_data = json.load(f)
+            embed = _build_embed(report_data)
+        except Exception as e:
+            _reject_report(path, f"unreadable report ({e})")
+            continue
+        length = _embed_length(embed)
+        if batch and total_length + length > MAX_MESSAGE_CHARS:
+            _release_report(path)
+            break
+        attachment = report_data.get("attachment")
+        batch.append((path, embed, os.path.join(OUTBOX_DIR, attachment) if attachment else None))
+        total_length += length
+    return batch
+
+def _send_batch(batch: List[Tuple[str, Dict[str, Any], Optional[str]]]) -> Optional[int]:
+    """
+    Post a batch of report embeds (and their diagnostics attachments) to the webhook.
+    
+    Returns:
+        int: HTTP status code, or None if the webhook could not be reached
+    """
+    count = len(batch)
+    payload = {
+        "content": "New bug report from Architect Tracker" if count == 1
+                   else f"{count} new bug reports from Architect Tracker",
+        "embeds": [embed for _, embed, _ in batch]
+    }
+    try:
+        files = {}
+        for _, _, attachment_path in batch:
+            if not attachment_path:
+                continue
+            try:
+                with open(attachment_path, "rb") as f:
+                    files[f"files[{len(files)}]"] = (os.path.basename(attachment_path), f.read(), "application/gzip")
+            except FileNotFoundError:
+                logger.warning(f"Diagnostics attachment {attachment_path} is missing")
+        
+        if files:
+            response = http_client.post(DISCORD_WEBHOOK_URL, 
+                                        data={"payload_json": json.dumps(payload)},
+                                        files=files)
+        else:
+            response = http_client.post(DISCORD_WEBHOOK_URL, 
+                                        json=payload,
+                                        headers={"Content-Type": "application/json"})
+        return response.status_code
+    except Exception as e:
+        logger.warning(f"Bug report delivery failed: {e}")
+        return None
+
+def _outbox_sender():
+    """Background thread that drains the outbox, retrying with backoff while offline."""
+    retry_delay = OUTBOX_RETRY_MIN
+    max_reports = MAX_EMBEDS_PER_MESSAGE
+    _reclaim_stale_claims()
+    while True:
+        _sender_wake.clear()
+        paths = pending_reports()
+        if not paths:
+            _sender_wake.wait()
+            continue
+        
+        batch = _next_batch(paths, max_reports)
+        if not batch:
+            continue
+        
+        status = _send_batch(batch)
+        if status is not None and 200 <= status < 300:
+            for path, _, attachment_path in batch:
+                with suppress(FileNotFoundError):
+                    os.remove(path)
+                if attachment_path:
+                    with suppress(FileNotFoundError):
+                        os.remove(attachment_path)
+            logger.info(f"Delivered {len(batch)} queued bug report(s)")
+            retry_delay = OUTBOX_RETRY_MIN
+            max_reports = MAX_EMBEDS_PER_MESSAGE
+        elif status is not None and 400 <= status < 500 and status != 429:
+            # The webhook refused the payload; isolate the bad report by sending one at a time
+            if len(batch) > 1:
+                max_reports = 1
+                for path, _, _ in batch:
+                    _release_report(path)
+            else:
+                _reject_report(batch[0][0], f"webhook returned {status}")
+        else:
+            for path, _, _ in batch:
+                _release_report(path)
+            logger.info(f"Bug report outbox offline, retrying in {retry_delay}s")
+            _sender_wake.wait(retry_delay)
+            retry_delay = min(retry_delay * 2, OUTBOX_RETRY_MAX)
+
+def start_outbox_sender():
+    """Start the background outbox sender if it is not running, or wake it up."""
+    global _sender_thread
+    with _sender_lock:
+        if _sender_thread is None or not _sender_thread.is_alive():
+            _sender_thread = threading.Thread(target=_outbox_sender, name="ArchitectTrackerBugOutbox")
+            _sender_thread.daemon = True
+            _sender_thread.start()
+    _sender_wake.set()
 
 def show_bug_report_dialog(parent, theme_colors=None):
     """Show the bug report dialog."""
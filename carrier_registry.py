@@ -0,0 +1,510 @@
+import binascii
+import json
+import logging
+import os
+import re
+import time
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+import commodities
+from settings import USER_DIR, write_json_atomic
+from shared_state import EMPTY, freeze, writer
+
+# Configure logger
+logger = logging.getLogger("ArchitectTracker.Carriers")
+
+# One file per carrier (<callsign>.json) plus the registry's own settings
+CARRIERS_DIR = os.path.join(USER_DIR, "carriers")
+REGISTRY_FILE = "registry.json"
+# Single-carrier file used before carriers were tracked by callsign
+LEGACY_CARRIER_FILE = os.path.join(USER_DIR, "fleet_carrier_cargo.json")
+
+# Confidence markers of the Carrier Qty column
+CONFIRMED = ""  # as last reported by CAPI
+ESTIMATED = "~"  # changed by journal events since the last CAPI sync
+UNCERTAIN = "?"  # open market order; other commanders' trades are not journaled
+
+
+def decode_vanity_name(hex_string):
+    try:
+        return binascii.unhexlify(hex_string).decode('utf-8')
+    except Exception as e:
+        logger.error(f"Failed to decode vanity name: {e}")
+        return hex_string
+
+
+# --- Fleet Carrier Cargo Tracker ---
+class FleetCarrierCargoTracker:
+    """Cargo of one fleet carrier, persisted to its own file."""
+
+    def __init__(self, callsign, path):
+        self.callsign = callsign
+        self.path = path
+        self.carrier_name = ""
+        self.commodities = {}  # commodity ID -> quantity
+        self.updated = None  # time of the last change
+        self.synced = None  # time of the last CAPI reconciliation
+        # How far journal-tracked quantities were off when CAPI reported the truth
+        self.drift = {"reconciliations": 0, "with_drift": 0, "abs_tonnes": 0, "last": {}}
+        self.estimated = {}  # commodity ID -> time of the last journal-tracked change since the last sync
+        self.orders = {}  # commodity ID -> ["sale" or "purchase", outstanding tonnes, price]
+
+    def get_quantity(self, cid):
+        return self.commodities.get(cid, 0)
+
+    def save(self):
+        try:
+            write_json_atomic(self.path, {
+                "carrier_name": self.carrier_name,
+                "callsign": self.callsign,
+                "updated": self.updated,
+                "synced": self.synced,
+                "drift": self.drift,
+                "estimated": {commodities.symbol(cid): when for cid, when in self.estimated.items()},
+                "orders": {commodities.symbol(cid): order for cid, order in self.orders.items()},
+                "commodities": {commodities.symbol(cid): qty for cid, qty in self.commodities.items()}
+            }, indent=4)
+        except Exception as e:
+            logger.error("Error saving fleet carrier cargo: %s", e)
+
+    def load(self, path=None):
+        path = path or self.path
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.carrier_name = data.get("carrier_name", "")
+            self.callsign = data.get("callsign") or self.callsign
+            self.updated = data.get("updated")
+            self.synced = data.get("synced")
+            self.drift.update(data.get("drift", {}))
+            self.commodities = {}
+            for name, qty in data.get("commodities", {}).items():
+                cid = commodities.commodity_id(name)
+                self.commodities[cid] = self.commodities.get(cid, 0) + qty
+            self.estimated = {commodities.commodity_id(name): when
+                              for name, when in data.get("estimated", {}).items()}
+            self.orders = {commodities.commodity_id(name): order
+                           for name, order in data.get("orders", {}).items()}
+        except Exception as e:
+            logger.error("Error loading fleet carrier cargo: %s", e)
+
+
+class CarrierView(NamedTuple):
+    """Published, unchanging state of one carrier."""
+    carrier_name: str
+    selected: bool
+    synced: Optional[float]
+    commodities: MappingProxyType  # commodity ID -> quantity
+    estimated: FrozenSet[int]  # commodity IDs changed by journal events since the last sync
+    orders: FrozenSet[int]  # commodity IDs with an open market order
+    drift: MappingProxyType
+
+
+class RegistrySnapshot(NamedTuple):
+    carriers: MappingProxyType  # callsign -> CarrierView
+    totals: MappingProxyType  # commodity ID -> quantity over the selected carriers
+
+
+# --- Carrier Registry ---
+class CarrierRegistry:
+    """
+    All known fleet carriers, keyed by callsign.
+
+    `totals` holds the summed quantity of every commodity over the selected
+    carriers and is kept up to date on every change, so the Carrier Qty
+    column is a single dict lookup per row.
+
+    `carriers` and `totals` are the working copy and only touched by writers
+    (see shared_state); readers use `snapshot`.
+    """
+
+    def __init__(self, directory=CARRIERS_DIR, legacy_file=LEGACY_CARRIER_FILE):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.carriers: Dict[str, FleetCarrierCargoTracker] = {}
+        self.selected = None  # set of selected callsigns; None selects every carrier
+        self.own_callsign = None  # carrier returned by CAPI
+        self.docked_callsign = None  # carrier the commander is docked at
+        self.market_ids: Dict[int, str] = {}  # carrier MarketID -> callsign
+        self.totals: Dict[int, int] = {}  # commodity ID -> quantity over the selected carriers
+        self.loaded = False
+        self.snapshot = RegistrySnapshot(EMPTY, EMPTY)
+        self._write_depth = 0
+
+    def _publish(self):
+        self.snapshot = RegistrySnapshot(MappingProxyType({
+            callsign: CarrierView(tracker.carrier_name or callsign, self.is_selected(callsign), tracker.synced,
+                                  freeze(tracker.commodities), frozenset(tracker.estimated),
+                                  frozenset(tracker.orders), freeze(dict(tracker.drift, last=dict(tracker.drift["last"]))))
+            for callsign, tracker in self.carriers.items()
+        }), freeze(self.totals))
+
+    # Persistence
+    def _carrier_path(self, callsign):
+        return os.path.join(self.directory, re.sub(r"[^0-9A-Za-z_-]", "_", callsign) + ".json")
+
+    @writer
+    def load(self):
+        """Load every carrier file, migrating the old single-carrier file on first run."""
+        self.loaded = True
+        os.makedirs(self.directory, exist_ok=True)
+        registry_path = os.path.join(self.directory, REGISTRY_FILE)
+        if os.path.exists(registry_path):
+            try:
+                with open(registry_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.own_callsign = data.get("own_callsign")
+                selected = data.get("selected")
+                self.selected = set(selected) if selected is not None else None
+                self.market_ids = {int(market_id): callsign
+                                   for market_id, callsign in data.get("market_ids", {}).items()}
+            except Exception as e:
+                logger.error(f"Error loading carrier registry: {e}")
+
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(".json") or file_name == REGISTRY_FILE:
+                continue
+            tracker = FleetCarrierCargoTracker("", os.path.join(self.directory, file_name))
+            tracker.load()
+            if tracker.callsign:
+                self.carriers[tracker.callsign] = tracker
+
+        if not self.carriers and os.path.exists(self.legacy_file):
+            self._migrate_legacy_file()
+        self._rebuild_totals()
+
+    def _migrate_legacy_file(self):
+        tracker = FleetCarrierCargoTracker("", "")
+        tracker.load(self.legacy_file)
+        tracker.callsign = tracker.callsign or "Unknown"
+        tracker.path = self._carrier_path(tracker.callsign)
+        self.carriers[tracker.callsign] = tracker
+        self.own_callsign = tracker.callsign
+        tracker.save()
+        self._save_registry()
+        try:
+            os.replace(self.legacy_file, self.legacy_file + ".migrated")
+        except OSError as e:
+            logger.error(f"Could not rename {self.legacy_file}: {e}")
+        logger.info(f"Migrated fleet carrier cargo to {tracker.path}")
+
+    def _save_registry(self):
+        try:
+            write_json_atomic(os.path.join(self.directory, REGISTRY_FILE), {
+                "own_callsign": self.own_callsign,
+                "selected": sorted(self.selected) if self.selected is not None else None,
+                "market_ids": {str(market_id): callsign for market_id, callsign in self.market_ids.items()},
+            }, indent=4)
+        except Exception as e:
+            logger.error(f"Error saving carrier registry: {e}")
+
+    # Selection and totals
+    def is_selected(self, callsign):
+        return self.selected is None or callsign in self.selected
+
+    def _rebuild_totals(self):
+        totals = {}
+        for callsign, tracker in self.carriers.items():
+            if self.is_selected(callsign):
+                for cid, qty in tracker.commodities.items():
+                    totals[cid] = totals.get(cid, 0) + qty
+        self.totals = totals
+
+    @writer
+    def set_selected(self, callsign, selected):
+        """Include or exclude a carrier from the Carrier Qty column."""
+        if self.selected is None:
+            self.selected = set(self.carriers)
+        if selected:
+            self.selected.add(callsign)
+        else:
+            self.selected.discard(callsign)
+        self._rebuild_totals()
+        self._save_registry()
+
+    def get_quantity(self, cid):
+        return self.snapshot.totals.get(cid, 0)
+
+    def _set_quantity(self, tracker, cid, qty):
+        """Set a carrier's quantity of one commodity, updating totals by the difference."""
+        delta = qty - tracker.commodities.get(cid, 0)
+        if not delta:
+            return 0
+        if qty:
+            tracker.commodities[cid] = qty
+        else:
+            tracker.commodities.pop(cid, None)
+        if self.is_selected(tracker.callsign):
+            total = self.totals.get(cid, 0) + delta
+            if total:
+                self.totals[cid] = total
+            else:
+                self.totals.pop(cid, None)
+        return delta
+
+    def _track(self, tracker, cid, qty, now):
+        """Apply a journal-tracked quantity, marking it as estimated until the next CAPI sync."""
+        delta = self._set_quantity(tracker, cid, max(0, qty))
+        tracker.estimated[cid] = now
+        tracker.updated = now
+        return delta
+
+    def confidence(self, cid):
+        """
+        Confidence marker of a commodity's Carrier Qty.
+
+        Returns:
+            str: UNCERTAIN if a selected carrier has an open market order for it,
+                ESTIMATED if journal events changed it since the last CAPI sync,
+                CONFIRMED otherwise
+        """
+        marker = CONFIRMED
+        for view in self.snapshot.carriers.values():
+            if not view.selected:
+                continue
+            if cid in view.orders:
+                return UNCERTAIN
+            if cid in view.estimated or view.synced is None and cid in view.commodities:
+                marker = ESTIMATED
+        return marker
+
+    def last_synced(self):
+        """Time of the oldest CAPI sync over the selected carriers (None if one never synced)."""
+        synced = [view.synced for view in self.snapshot.carriers.values() if view.selected]
+        if not synced or None in synced:
+            return None
+        return min(synced)
+
+    # Carriers
+    @writer
+    def get(self, callsign, create=True) -> Optional[FleetCarrierCargoTracker]:
+        tracker = self.carriers.get(callsign)
+        if tracker is None and create and callsign:
+            tracker = self.carriers[callsign] = FleetCarrierCargoTracker(callsign, self._carrier_path(callsign))
+            # Newly seen carriers count towards the totals until deselected
+            if self.selected is not None:
+                self.selected.add(callsign)
+                self._save_registry()
+        return tracker
+
+    @writer
+    def remove(self, callsign):
+        """Forget a carrier and delete its file."""
+        tracker = self.carriers.get(callsign)
+        if tracker is None:
+            return
+        for cid in list(tracker.commodities):
+            self._set_quantity(tracker, cid, 0)
+        del self.carriers[callsign]
+        if self.selected is not None:
+            self.selected.discard(callsign)
+        self.market_ids = {market_id: owner for market_id, owner in self.market_ids.items() if owner != callsign}
+        self._save_registry()
+        try:
+            os.remove(tracker.path)
+        except OSError:
+            pass
+
+    def carrier_names(self) -> List[str]:
+        """Names of the selected carriers."""
+        return [view.carrier_name for _, view in sorted(self.snapshot.carriers.items()) if view.selected]
+
+    @writer
+    def set_docked(self, callsign, market_id=None):
+        """Remember which carrier the commander is docked at (None when not at a carrier)."""
+        self.docked_callsign = callsign
+        if callsign and market_id is not None:
+            self.remember_market(market_id, callsign)
+
+    @writer
+    def remember_market(self, market_id, callsign):
+        """Map a carrier's MarketID to its callsign, so its market events can be attributed."""
+        if market_id is not None and callsign and self.market_ids.get(market_id) != callsign:
+            self.market_ids[market_id] = callsign
+            self._save_registry()
+
+    @writer
+    def update(self, data):
+        """
+        Reconcile the commander's own carrier with CAPI data.
+
+        Only commodities whose quantity differs are changed, and the carrier
+        file is only written if something did. The differences are what the
+        journal-based tracking missed and are recorded as drift.
+
+        Open market orders are replaced by the ones CAPI reports, and every
+        quantity is confirmed again.
+
+        Returns:
+            tuple: (callsign, {commodity ID: quantity change}, IDs whose confidence changed);
+                (None, {}, set()) for unusable data
+        """
+        cargo_items = data.get('cargo', [])
+        if not isinstance(cargo_items, list):
+            logger.warning("Unexpected cargo data format.")
+            return None, {}, set()
+        carrier_info = data.get("name", {})
+        callsign = carrier_info.get("callsign") or self.own_callsign or "Unknown"
+        tracker = self.get(callsign)
+        if callsign != self.own_callsign:
+            if callsign != "Unknown":
+                # Cargo tracked before the callsign was known (a migrated file or
+                # transfers before the first sync) is the own carrier's, and CAPI
+                # now reports all of it
+                self.remove("Unknown")
+            self.own_callsign = callsign
+            if self.selected is not None:
+                self.selected.add(callsign)
+            self._save_registry()
+
+        quantities = {}
+        for item in cargo_items:
+            name = item.get("commodity")
+            qty = item.get("qty", 0)
+            if not name:
+                logger.warning("Missing commodity name in cargo item: %s", item)
+                continue
+            cid = commodities.commodity_id(name)
+            quantities[cid] = quantities.get(cid, 0) + qty
+        deltas = {}
+        for cid in set(tracker.commodities) | set(quantities):
+            delta = self._set_quantity(tracker, cid, quantities.get(cid, 0))
+            if delta:
+                deltas[cid] = delta
+
+        hex_name = carrier_info.get("vanityName")
+        carrier_name = decode_vanity_name(hex_name) if hex_name else "Unnamed Carrier"
+        renamed = carrier_name != tracker.carrier_name
+        tracker.carrier_name = carrier_name
+
+        now = time.time()
+        first_sync = tracker.synced is None
+        if not first_sync:
+            # The first sync only fills the carrier; later ones show what tracking missed
+            drift = tracker.drift
+            drift["reconciliations"] += 1
+            drift["last"] = {commodities.symbol(cid): delta for cid, delta in deltas.items()}
+            if deltas:
+                drift["with_drift"] += 1
+                drift["abs_tonnes"] += sum(abs(delta) for delta in deltas.values())
+                logger.info(f"Carrier {callsign} drift: {drift['last']}")
+        tracker.synced = now
+        if deltas:
+            tracker.updated = now
+
+        orders = self._capi_orders(data)
+        if orders is None:
+            orders = tracker.orders
+        confidence_changed = set(tracker.estimated) | (set(tracker.orders) ^ set(orders))
+        orders_changed = orders != tracker.orders
+        tracker.estimated = {}
+        tracker.orders = orders
+        market = data.get("market")
+        if isinstance(market, dict):
+            self.remember_market(market.get("id"), callsign)
+        # Reconciliation counts of unchanged syncs are written with the next change
+        if deltas or renamed or first_sync or confidence_changed or orders_changed:
+            tracker.save()
+        return callsign, deltas, confidence_changed
+
+    @staticmethod
+    def _capi_orders(data):
+        """Open commodity orders of CAPI carrier data; None if the data has none."""
+        try:
+            orders_data = data.get("orders", {}).get("commodities")
+        except AttributeError:
+            return None
+        if not isinstance(orders_data, dict):
+            return None
+        orders = {}
+        for kind, key, amount_key in (("sale", "sales", "stock"), ("purchase", "purchases", "outstanding")):
+            items = orders_data.get(key) or []
+            if isinstance(items, dict):
+                items = list(items.values())
+            for item in items:
+                name = item.get("name")
+                amount = item.get(amount_key, 0)
+                if name and amount:
+                    orders[commodities.commodity_id(name)] = [kind, amount, item.get("price", 0)]
+        return orders
+
+    def drift_summary(self):
+        """Drift statistics per carrier, for diagnostics."""
+        return {callsign: dict(view.drift) for callsign, view in self.snapshot.carriers.items()}
+
+    @writer
+    def apply_transfer_event(self, transfers):
+        """Apply a CargoTransfer to the carrier the commander is docked at (or their own)."""
+        tracker = self.get(self.docked_callsign or self.own_callsign or "Unknown")
+        now = time.time()
+        for transfer in transfers:
+            name = transfer.get("Type")
+            qty = transfer.get("Count", 0)
+            direction = transfer.get("Direction")
+            if not name or qty <= 0 or direction not in ("tocarrier", "toship"):
+                continue
+            cid = commodities.commodity_id(name)
+            self._track(tracker, cid, tracker.get_quantity(cid) + (qty if direction == "tocarrier" else -qty), now)
+        tracker.updated = now
+        tracker.save()
+
+    @writer
+    def apply_trade_order(self, entry):
+        """
+        Apply a CarrierTradeOrder journal event: the owner opened, changed or cancelled a market order.
+
+        Returns:
+            int: ID of the commodity whose order changed, None if the event was not usable
+        """
+        name = entry.get("Commodity")
+        if not name:
+            return None
+        market_id = entry.get("CarrierID")
+        # Only the owner can place orders, so an unknown carrier is their own
+        callsign = self.market_ids.get(market_id) or self.own_callsign
+        tracker = self.get(callsign, create=False) if callsign else None
+        if tracker is None:
+            return None
+        self.remember_market(market_id, callsign)
+        cid = commodities.commodity_id(name)
+        if entry.get("Commodity_Localised"):
+            commodities.register_name(entry["Commodity_Localised"], cid)
+        if entry.get("CancelTrade"):
+            tracker.orders.pop(cid, None)
+        elif entry.get("SaleOrder"):
+            tracker.orders[cid] = ["sale", entry["SaleOrder"], entry.get("Price", 0)]
+        elif entry.get("PurchaseOrder"):
+            tracker.orders[cid] = ["purchase", entry["PurchaseOrder"], entry.get("Price", 0)]
+        else:
+            return None
+        tracker.save()
+        return cid
+
+    @writer
+    def apply_market_trade(self, market_id, event, name, count):
+        """
+        Apply the commander's own MarketBuy/MarketSell at a tracked carrier's market.
+
+        Selling to the carrier adds to its stock and fills its purchase order,
+        buying from it takes from its stock and its sale order.
+
+        Returns:
+            int: ID of the traded commodity, None if the market is not a tracked carrier
+        """
+        callsign = self.market_ids.get(market_id)
+        tracker = self.get(callsign, create=False) if callsign else None
+        if tracker is None or not name or count <= 0:
+            return None
+        cid = commodities.commodity_id(name)
+        delta = count if event == "MarketSell" else -count
+        self._track(tracker, cid, tracker.get_quantity(cid) + delta, time.time())
+        order = tracker.orders.get(cid)
+        if order and order[0] == ("purchase" if delta > 0 else "sale"):
+            order[1] -= count
+            if order[1] <= 0:
+                del tracker.orders[cid]
+        tracker.save()
+        return cid
@@ -0,0 +1,76 @@
+import re
+from typing import Dict, List, Optional
+
+# Canonical commodity IDs shared by journal, market, cargo and carrier data.
+#
+# The same commodity is spelled differently by every source:
+#   journal / Market.json:  "$cmmcomposite_name;"
+#   Cargo.json, trades:     "cmmcomposite"
+#   carrier CAPI:           "CMMComposite"
+#   localised names:        "CMM Composite"
+# All of them normalise to the same key and get one small integer ID.
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]")
+
+_ids: Dict[str, int] = {}  # normalised key -> ID
+_spellings: Dict[str, int] = {}  # any spelling seen so far -> ID
+_symbols: List[str] = []  # ID -> normalised key
+_names: List[str] = []  # ID -> display name
+
+
+def normalize(name: str) -> str:
+    """Reduce any spelling of a commodity to its canonical key ("$Liquid_Oxygen_name;" -> "liquidoxygen")."""
+    key = name.lower()
+    if key.startswith("$"):
+        key = key[1:]
+    if key.endswith("_name;"):
+        key = key[:-6]
+    return _NON_ALNUM.sub("", key)
+
+
+def commodity_id(name: str) -> int:
+    """
+    Get the ID of a commodity, assigning a new one the first time it is seen.
+
+    Args:
+        name (str): Any spelling of the commodity
+
+    Returns:
+        int: Canonical commodity ID
+    """
+    cid = _spellings.get(name)
+    if cid is None:
+        key = normalize(name)
+        cid = _ids.get(key)
+        if cid is None:
+            cid = _ids[key] = len(_symbols)
+            _symbols.append(key)
+            _names.append(name)
+        _spellings[name] = cid
+    return cid
+
+
+def find(name: str) -> Optional[int]:
+    """Get the ID of a known commodity without assigning a new one."""
+    cid = _spellings.get(name)
+    if cid is None:
+        cid = _ids.get(normalize(name))
+    return cid
+
+
+def register_name(name: str, cid: int):
+    """Record a localised name for a commodity; it also becomes a spelling of it."""
+    if name:
+        _names[cid] = name
+        _spellings.setdefault(name, cid)
+        _ids.setdefault(normalize(name), cid)
+
+
+def symbol(cid: int) -> str:
+    """Canonical key of a commodity ID."""
+    return _symbols[cid]
+
+
+def display_name(cid: int) -> str:
+    """Localised name if one was registered, otherwise the first spelling seen."""
+    return _names[cid]
@@ -0,0 +1,638 @@
+import json
+import logging
+import os
+import time
+from array import array
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import commodities
+import site_archive
+from settings import write_json_atomic
+from shared_state import EMPTY, freeze, writer
+
+# Configure logger
+logger = logging.getLogger("ArchitectTracker.Store")
+
+# On-disk format of construction_requirements.json
+#
+# Version 1 (legacy, no version field):
+#   {station: {"system": str, "materials": {symbol: {"Name_Localised", "RequiredAmount", "ProvidedAmount"}}}}
+#
+# Version 2:
+#   {"version": 2,
+#    "commodities": [[symbol, localised name], ...],
+#    "sites": [[station, system, [commodity index, required, provided, ...]], ...]}
+#
+# Version 3 (sites keyed by MarketID; sites from older versions keep their station string as id):
+#   {"version": 3,
+#    "commodities": [[symbol, localised name], ...],
+#    "sites": [[site id, name, system, [commodity index, required, provided, ...]], ...],
+#    "aliases": {lowercase display name: site id}}
+#
+# Version 4 (site rows gain the time the site was first seen, null if unknown):
+#    "sites": [[site id, name, system, [commodity index, required, provided, ...], created], ...]
+#
+# Version 5 (site rows gain the time the site was last updated or visited):
+#    "sites": [[site id, name, system, [commodity index, required, provided, ...], created, updated], ...]
+SCHEMA_VERSION = 5
+
+# A visit is written to disk only if the stored last-updated time is older than this
+TOUCH_SAVE_INTERVAL = 24 * 3600  # seconds
+
+# A site is identified by its MarketID, or by its station string if it predates MarketID keys
+SiteId = Union[int, str]
+
+
+class StoreVersionError(Exception):
+    """The file was written by a newer plugin version and must not be overwritten."""
+
+
+def display_name(name: str) -> str:
+    """Station name without the colonisation ship prefix ('...: Name' or '$...; Name')."""
+    if ':' in name:
+        return name.split(':', 1)[-1].strip()
+    if ';' in name:
+        return name.split(';', 1)[-1].strip()
+    return name
+
+
+def alias_key(name: str) -> str:
+    """Normalised key used to look a site up by name."""
+    return display_name(name).lower()
+
+
+def _migrate_v1(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the legacy per-station dictionary to version 2."""
+    table = []
+    table_index = {}
+    rows = []
+    for station, info in document.items():
+        if not isinstance(info, dict):
+            continue
+        amounts = []
+        for symbol, values in info.get("materials", {}).items():
+            index = table_index.get(symbol)
+            if index is None:
+                index = table_index[symbol] = len(table)
+                table.append([symbol, values.get("Name_Localised", symbol)])
+            amounts.extend((index, values.get("RequiredAmount", 0), values.get("ProvidedAmount", 0)))
+        rows.append([station, info.get("system"), amounts])
+    return {"version": 2, "commodities": table, "sites": rows}
+
+
+def _migrate_v2(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Give every version 2 site an id (its station string) and build the alias table."""
+    rows = []
+    aliases = {}
+    for station, system, amounts in document.get("sites", []):
+        rows.append([station, station, system, amounts])
+        aliases[alias_key(station)] = station
+    return {"version": 3, "commodities": document.get("commodities", []), "sites": rows, "aliases": aliases}
+
+
+def _migrate_v3(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Add an unknown first-seen time to every site."""
+    document["sites"] = [row + [None] for row in document.get("sites", [])]
+    document["version"] = 4
+    return document
+
+
+def _migrate_v4(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Start the last-updated clock of every site at the time of the upgrade."""
+    now = time.time()
+    document["sites"] = [row + [now] for row in document.get("sites", [])]
+    document["version"] = 5
+    return document
+
+
+# Version -> function converting a document of that version to the next one
+MIGRATIONS: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    1: _migrate_v1,
+    2: _migrate_v2,
+    3: _migrate_v3,
+    4: _migrate_v4,
+}
+
+
+def migrate(document: Any) -> Dict[str, Any]:
+    """
+    Bring a loaded document up to SCHEMA_VERSION.
+
+    Args:
+        document: Parsed JSON of any supported version
+
+    Returns:
+        dict: Document in the current format
+
+    Raises:
+        StoreVersionError: If the document is newer than this plugin supports
+    """
+    if not isinstance(document, dict):
+        return {"version": SCHEMA_VERSION, "commodities": [], "sites": [], "aliases": {}}
+    version = document.get("version", 1) if isinstance(document.get("version"), int) else 1
+    if version > SCHEMA_VERSION:
+        raise StoreVersionError(f"Unsupported construction data version {version}")
+    while version < SCHEMA_VERSION:
+        logger.info(f"Migrating construction data from version {version}")
+        document = MIGRATIONS[version](document)
+        version += 1
+    return document
+
+
+class Site:
+    """
+    One construction site.
+
+    Amounts are kept in parallel integer arrays in the depot's order:
+    ids[i] is a canonical commodity ID (see commodities.py), required[i] and
+    provided[i] its amounts. `unsatisfied` counts the commodities still
+    short, so completeness is known without scanning the arrays. `created`
+    is when the site was first seen (epoch seconds, None if unknown) and
+    `updated` when it was last updated or visited.
+    """
+    __slots__ = ("name", "system", "ids", "required", "provided", "unsatisfied", "created", "updated")
+
+    def __init__(self, name: str, system: Optional[str], ids=(), required=(), provided=(),
+                 created: Optional[float] = None, updated: Optional[float] = None):
+        self.name = name
+        self.system = system
+        self.created = created
+        self.updated = updated
+        self.ids = array("l", ids)
+        self.required = array("l", required)
+        self.provided = array("l", provided)
+        self.unsatisfied = sum(map(int.__lt__, self.provided, self.required))
+
+    @classmethod
+    def from_materials(cls, name: str, system: Optional[str], materials: Dict[str, Dict[str, Any]]) -> "Site":
+        """
+        Build a site from journal-style materials ({symbol: {"Name_Localised", "RequiredAmount", "ProvidedAmount"}}).
+
+        Localised names are registered with commodities.py, so every caller keeps them.
+        """
+        ids = []
+        for symbol, values in materials.items():
+            cid = commodities.commodity_id(symbol)
+            commodities.register_name(values.get("Name_Localised"), cid)
+            ids.append(cid)
+        values = materials.values()
+        return cls(name, system, ids,
+                   (v.get("RequiredAmount", 0) for v in values),
+                   (v.get("ProvidedAmount", 0) for v in values))
+
+    def position(self, cid: int) -> Optional[int]:
+        """Index of a commodity in the arrays, or None if the site does not need it."""
+        try:
+            return self.ids.index(cid)
+        except ValueError:
+            return None
+
+    def rows(self):
+        """Iterate (commodity ID, required, provided)."""
+        return zip(self.ids, self.required, self.provided)
+
+    def total_required(self) -> int:
+        return sum(self.required)
+
+    def total_provided(self) -> int:
+        """Provided amounts, not counting deliveries above the requirement."""
+        return sum(map(min, self.required, self.provided))
+
+    def total_needed(self) -> int:
+        return self.total_required() - self.total_provided()
+
+    def is_complete(self) -> bool:
+        return self.unsatisfied == 0
+
+    def add_provided(self, i: int, amount: int):
+        """Add a delivery to commodity position i (capped at the requirement)."""
+        was_short = self.provided[i] < self.required[i]
+        self.provided[i] = min(self.required[i], self.provided[i] + amount)
+        if was_short and self.provided[i] >= self.required[i]:
+            self.unsatisfied -= 1
+
+    def fingerprint(self) -> int:
+        """Fingerprint of the amounts, used to detect unchanged depot snapshots."""
+        return hash((self.ids.tobytes(), self.required.tobytes(), self.provided.tobytes()))
+
+    def copy(self) -> "Site":
+        site = Site(self.name, self.system, self.ids, self.required, self.provided, self.created, self.updated)
+        site.unsatisfied = self.unsatisfied
+        return site
+
+
+def encode(sites: Dict[SiteId, Site], aliases: Dict[str, SiteId]) -> Dict[str, Any]:
+    """
+    Convert sites to the compact current-version document.
+
+    Commodity symbols and localised names are stored once in a shared table;
+    each site row references them by index.
+    """
+    table = []
+    table_index = {}
+    rows = []
+    for site_id, site in sites.items():
+        amounts = []
+        for cid, required, provided in site.rows():
+            index = table_index.get(cid)
+            if index is None:
+                index = table_index[cid] = len(table)
+                table.append([commodities.symbol(cid), commodities.display_name(cid)])
+            amounts.extend((index, required, provided))
+        rows.append([site_id, site.name, site.system, amounts, site.created, site.updated])
+    return {"version": SCHEMA_VERSION, "commodities": table, "sites": rows, "aliases": aliases}
+
+
+def decode(document: Dict[str, Any]) -> Tuple[Dict[SiteId, Site], Dict[str, SiteId]]:
+    """Convert a current-version document back to (sites, aliases)."""
+    ids = []
+    for symbol, localised in document.get("commodities", []):
+        cid = commodities.commodity_id(symbol)
+        commodities.register_name(localised, cid)
+        ids.append(cid)
+    sites = {}
+    for site_id, name, system, amounts, created, updated in document.get("sites", []):
+        sites[site_id] = Site(name, system, (ids[i] for i in amounts[0::3]), amounts[1::3], amounts[2::3],
+                              created, updated)
+    aliases = {key: site_id for key, site_id in document.get("aliases", {}).items() if site_id in sites}
+    return sites, aliases
+
+
+class StoreSnapshot(NamedTuple):
+    """
+    Published state of a ConstructionStore; neither the mappings nor the sites are ever changed.
+
+    Complete sites are left out: they are only archived and dropped on the
+    next save, but are no longer worth showing.
+    """
+    revision: int
+    sites: MappingProxyType  # site id -> Site
+    aliases: MappingProxyType  # alias_key(name) -> site id
+
+
+class ConstructionStore:
+    """
+    In-memory construction sites keyed by MarketID, persisted to construction_requirements.json.
+
+    `sites` and `aliases` are the working copy and only touched by writers
+    (see shared_state). Other code, and any other thread, reads `snapshot`.
+    """
+
+    def __init__(self, path: str, archive_path: Optional[str] = None):
+        self.path = path
+        self.archive_path = archive_path  # completed and stale sites are appended here (see site_archive)
+        self.max_age_days = 0  # sites not updated for this many days are archived on save; 0 = never
+        self.sites: Dict[SiteId, Site] = {}
+        self.aliases: Dict[str, SiteId] = {}  # alias_key(name) -> site id
+        self._fingerprints: Dict[SiteId, int] = {}  # site id -> Site.fingerprint(), filled lazily
+        self.loaded = False
+        self.read_only = False
+        # Bumped on every change; cached aggregates are only valid for one revision
+        self.revision = 0
+        # (snapshot revision, {site ids: aggregate}), replaced as a whole
+        self._aggregates: Tuple[int, Dict[Tuple[SiteId, ...], Site]] = (0, {})
+        self.snapshot = StoreSnapshot(0, EMPTY, EMPTY)
+        self._dirty = set()  # site ids changed since the last snapshot; None if all of them
+        self._write_depth = 0
+
+    def _publish(self):
+        """Publish the changed sites as a new snapshot, sharing the copies of unchanged ones."""
+        if self._dirty is None:
+            sites = {site_id: site.copy() for site_id, site in self.sites.items() if not site.is_complete()}
+        elif self._dirty:
+            sites = dict(self.snapshot.sites)
+            for site_id in self._dirty:
+                site = self.sites.get(site_id)
+                if site is None or site.is_complete():
+                    sites.pop(site_id, None)
+                else:
+                    sites[site_id] = site.copy()
+        else:
+            return
+        self._dirty = set()
+        self.snapshot = StoreSnapshot(self.revision, MappingProxyType(sites), freeze(self.aliases))
+
+    @writer
+    def load(self):
+        """Load the sites from disk (any supported version)."""
+        self.loaded = True
+        self.revision += 1
+        self._dirty = None
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+            self.sites, self.aliases = decode(migrate(document))
+        except StoreVersionError as e:
+            logger.error(f"{e}; construction data will not be saved")
+            self.read_only = True
+        except Exception as e:
+            logger.error(f"Error reading construction data: {e}")
+
+    @writer
+    def prune_completed(self) -> List[SiteId]:
+        """Move completed sites to the archive. Returns the removed site ids."""
+        completed = [site_id for site_id, site in self.sites.items() if site.is_complete()]
+        if completed and self.archive_path:
+            try:
+                site_archive.append([site_archive.site_record("completed", site_id, self.sites[site_id])
+                                     for site_id in completed], self.archive_path)
+            except Exception as e:
+                # Keep the sites rather than lose their history; the next save tries again
+                logger.error(f"Error archiving completed sites: {e}")
+                return []
+        for site_id in completed:
+            logger.info(f"Construction site '{self.sites[site_id].name}' is complete")
+            self.remove(site_id)
+        return completed
+
+    def stale_sites(self, now: Optional[float] = None) -> List[SiteId]:
+        """Sites not updated or visited for max_age_days."""
+        if self.max_age_days <= 0:
+            return []
+        cutoff = (time.time() if now is None else now) - self.max_age_days * 86400
+        return [site_id for site_id, site in self.sites.items() if site.updated is not None and site.updated < cutoff]
+
+    @writer
+    def prune_stale(self) -> List[SiteId]:
+        """Move stale sites to the archive. Returns the removed site ids."""
+        stale = self.stale_sites()
+        if stale and self.archive_path:
+            try:
+                site_archive.append([site_archive.site_record("stale", site_id, self.sites[site_id])
+                                     for site_id in stale], self.archive_path)
+            except Exception as e:
+                # Keep the sites rather than lose them
+                logger.error(f"Error archiving stale sites: {e}")
+                return []
+        for site_id in stale:
+            logger.info(f"Construction site '{self.sites[site_id].name}' not updated for "
+                        f"{self.max_age_days} days, archived")
+            self.remove(site_id)
+        return stale
+
+    @writer
+    def save(self):
+        """Archive completed and stale sites and write the rest in the compact current format (atomic replace)."""
+        if self.read_only:
+            logger.warning("Construction data is from a newer plugin version, not saving")
+            return
+        self.prune_completed()
+        self.prune_stale()
+        write_json_atomic(self.path, encode(self.sites, self.aliases), ensure_ascii=False, separators=(",", ":"))
+
+    def resolve(self, market_id: Optional[int] = None, name: Optional[str] = None) -> Optional[SiteId]:
+        """Find a site by MarketID, falling back to its current or any earlier name."""
+        if market_id is not None and market_id in self.sites:
+            return market_id
+        if name:
+            return self.aliases.get(alias_key(name))
+        return None
+
+    def resolve_market(self, market_id: int, name: Optional[str], system: Optional[str]) -> Optional[SiteId]:
+        """
+        Find the site of a market, including one tracked before MarketID keys.
+
+        A name match only counts if its id is a legacy station string and its
+        system matches; another MarketID under the same name is a different
+        station (station names are not unique across systems).
+        """
+        if market_id in self.sites:
+            return market_id
+        site_id = self.resolve(None, name)
+        if not isinstance(site_id, str):
+            return None
+        stored_system = self.sites[site_id].system
+        if system and stored_system and stored_system != system:
+            return None
+        return site_id
+
+    def _add_alias(self, name: str, site_id: SiteId):
+        if name:
+            self.aliases[alias_key(name)] = site_id
+
+    def is_unchanged(self, market_id: Optional[int], name: str, materials: Dict[str, Dict[str, Any]]) -> bool:
+        """True if a depot snapshot matches the stored site exactly (no write needed)."""
+        site_id = self.resolve(market_id, name)
+        if site_id is None or (market_id is not None and site_id != market_id):
+            return False
+        site = self.sites[site_id]
+        if name and site.name != name:
+            return False
+        stored = self._fingerprints.get(site_id)
+        if stored is None:
+            stored = self._fingerprints[site_id] = site.fingerprint()
+        return stored == Site.from_materials(name, site.system, materials).fingerprint()
+
+    @writer
+    def upsert(self, market_id: Optional[int], name: str, system: str, materials: Dict[str, Dict[str, Any]],
+               complete: bool = False) -> SiteId:
+        """
+        Add or update a site from a depot snapshot.
+
+        A site tracked before MarketID keys is found by name (see
+        resolve_market) and re-keyed to the MarketID; any other new MarketID
+        becomes a new site. `complete` is
+        the depot's ConstructionComplete flag; it marks the site complete even
+        if the amounts do not add up.
+
+        Returns:
+            The site id
+        """
+        existing = self.resolve(None, name) if market_id is None else self.resolve_market(market_id, name, system)
+        site_id = market_id if market_id is not None else (existing if existing is not None else name)
+        if existing is not None and existing != site_id:
+            self.rekey(existing, site_id)
+        previous = self.sites.get(site_id)
+        now = time.time()
+        created = now
+        if previous is not None:
+            name = name or previous.name
+            system = system or previous.system
+            created = previous.created
+        site = self.sites[site_id] = Site.from_materials(name, system, materials)
+        site.created = created
+        site.updated = now
+        if complete:
+            site.unsatisfied = 0
+        self.revision += 1
+        self._dirty.add(site_id)
+        self._fingerprints[site_id] = site.fingerprint()
+        self._add_alias(name, site_id)
+        return site_id
+
+    @writer
+    def rekey(self, old_id: SiteId, new_id: SiteId):
+        """Move a site (and its aliases) to a new id, e.g. when its MarketID becomes known."""
+        site = self.sites.pop(old_id)
+        self.sites[new_id] = site
+        self.revision += 1
+        self._dirty.update((old_id, new_id))
+        self._fingerprints.pop(old_id, None)
+        for key, alias_id in self.aliases.items():
+            if alias_id == old_id:
+                self.aliases[key] = new_id
+        logger.info(f"Re-keyed construction site '{site.name}' from {old_id!r} to {new_id!r}")
+
+    @writer
+    def rename(self, site_id: SiteId, name: str) -> bool:
+        """
+        Update a site's display name; the old name keeps resolving to the site.
+
+        Returns:
+            bool: True if the name changed
+        """
+        site = self.sites.get(site_id)
+        if not site or not name or site.name == name:
+            return False
+        logger.info(f"Construction site {site_id!r} renamed from '{site.name}' to '{name}'")
+        site.name = name
+        self.revision += 1
+        self._dirty.add(site_id)
+        self._add_alias(name, site_id)
+        return True
+
+    @writer
+    def remove(self, site_id: SiteId) -> bool:
+        """Remove a site and its aliases. Returns True if the site existed."""
+        if self.sites.pop(site_id, None) is None:
+            return False
+        self.revision += 1
+        self._dirty.add(site_id)
+        self._fingerprints.pop(site_id, None)
+        self.aliases = {key: alias_id for key, alias_id in self.aliases.items() if alias_id != site_id}
+        return True
+
+    @writer
+    def apply_contribution(self, site_id: SiteId, contributions: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add delivered amounts from a ColonisationContribution event to a site.
+
+        Args:
+            site_id: Site the commodities were delivered to
+            contributions: The event's Contributions list ({"Name", "Amount"} entries)
+
+        Returns:
+            list: Commodity IDs whose provided amount changed
+        """
+        site = self.sites.get(site_id)
+        if not site:
+            return []
+        changed = []
+        for contribution in contributions:
+            amount = contribution.get("Amount", 0)
+            if not contribution.get("Name") or amount <= 0:
+                continue
+            cid = commodities.commodity_id(contribution["Name"])
+            i = site.position(cid)
+            if i is None:
+                continue
+            site.add_provided(i, amount)
+            changed.append(cid)
+        if changed:
+            self._fingerprints.pop(site_id, None)
+            site.updated = time.time()
+            self.revision += 1
+            self._dirty.add(site_id)
+        return changed
+
+    def aggregate(self, site_ids: List[SiteId], name: str = "All sites") -> Site:
+        """
+        Sum the amounts of several sites per commodity.
+
+        The sites' arrays are concatenated and reduced in a single pass; the
+        result is cached until the store changes. Reads the published
+        snapshot, so it is safe to call from any thread.
+
+        Args:
+            site_ids: Sites to include (unknown ids are skipped)
+            name: Name of the returned pseudo-site
+
+        Returns:
+            Site: One row per commodity, provided amounts capped at each site's requirement
+        """
+        key = tuple(site_ids)
+        snapshot = self.snapshot
+        revision, aggregates = self._aggregates
+        if revision != snapshot.revision:
+            aggregates = {}
+            self._aggregates = (snapshot.revision, aggregates)
+        cached = aggregates.get(key)
+        if cached is not None:
+            return cached
+
+        ids = array("l")
+        required = array("l")
+        provided = array("l")
+        for site_id in key:
+            site = snapshot.sites.get(site_id)
+            if site is not None:
+                ids.extend(site.ids)
+                required.extend(site.required)
+                provided.extend(map(min, site.required, site.provided))
+
+        totals: Dict[int, List[int]] = {}
+        for cid, req, prov in zip(ids, required, provided):
+            total = totals.get(cid)
+            if total is None:
+                totals[cid] = [req, prov]
+            else:
+                total[0] += req
+                total[1] += prov
+        result = Site(name, None, totals.keys(), (t[0] for t in totals.values()), (t[1] for t in totals.values()))
+        aggregates[key] = result
+        return result
+
+    @writer
+    def touch(self, site_id: SiteId) -> bool:
+        """
+        Record a visit to a site (docking, a repeated depot snapshot).
+
+        Returns:
+            bool: True if the previous time is old enough that the visit should be saved
+        """
+        site = self.sites.get(site_id)
+        if site is None:
+            return False
+        now = time.time()
+        due = site.updated is None or now - site.updated > TOUCH_SAVE_INTERVAL
+        site.updated = now
+        self._dirty.add(site_id)
+        return due
+
+    @writer
+    def restore(self, record: Dict[str, Any]) -> Optional[SiteId]:
+        """
+        Put an archived site back into the active set.
+
+        A site whose id is tracked again (a newer depot snapshot recreated it)
+        is not restored, so the live data is never replaced by the archived copy.
+
+        Args:
+            record: Archive record (see site_archive.site_record)
+
+        Returns:
+            The restored site id, None if the id is already tracked
+        """
+        site_id = record["site_id"]
+        if site_id in self.sites:
+            logger.warning(f"Not restoring '{record.get('name')}': site {site_id!r} is already tracked")
+            return None
+        rows = record.get("commodities", [])
+        ids = []
+        for symbol, localised, _, _ in rows:
+            cid = commodities.commodity_id(symbol)
+            commodities.register_name(localised, cid)
+            ids.append(cid)
+        site = Site(record.get("name", str(site_id)), record.get("system"), ids,
+                    (row[2] for row in rows), (row[3] for row in rows),
+                    record.get("started"), time.time())
+        self.sites[site_id] = site
+        self._fingerprints.pop(site_id, None)
+        self._add_alias(site.name, site_id)
+        self.revision += 1
+        self._dirty.add(site_id)
+        logger.info(f"Restored construction site '{site.name}' from the archive")
+        return site_id
@@ -0,0 +1,146 @@
+import datetime
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Tuple
+
+# Configure logger
+logger = logging.getLogger("ArchitectTracker.Diagnostics")
+
+# Constants
+MAX_BUNDLE_BYTES = 512 * 1024  # compressed size cap of a diagnostics bundle
+LOG_TAIL_LINES = 300
+
+# Session counters
+_lock = threading.Lock()
+_timings: Dict[str, list] = {}  # name -> [count, total seconds, max seconds]
+_event_counts = Counter()
+_providers: Dict[str, Callable[[], Any]] = {}
+_log_file = None
+_session_start = time.time()
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Record how long a block (or, used as a decorator, a function) takes.
+
+    Args:
+        name (str): Name of the hot path in the timing summary
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            entry = _timings.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+
+def count_event(event: str):
+    """Count a journal event for this session."""
+    with _lock:
+        _event_counts[event or "Unknown"] += 1
+
+
+def register_provider(name: str, provider: Callable[[], Any]):
+    """Register a function returning JSON-serialisable state for the bundle."""
+    _providers[name] = provider
+
+
+def set_log_file(path: str):
+    """Set the log file whose tail is included in the bundle."""
+    global _log_file
+    _log_file = path
+
+
+def timing_summary() -> Dict[str, Dict[str, float]]:
+    """Return count, total, average and maximum milliseconds per hot path."""
+    with _lock:
+        return {
+            name: {
+                "count": count,
+                "total_ms": round(total * 1000, 2),
+                "avg_ms": round(total * 1000 / count, 2) if count else 0.0,
+                "max_ms": round(longest * 1000, 2),
+            }
+            for name, (count, total, longest) in sorted(_timings.items())
+        }
+
+
+def _read_log_tail(path: str, lines: int) -> list:
+    """Read the last lines of a log file without loading all of it."""
+    if not path or not os.path.exists(path):
+        return []
+    block_size = 64 * 1024
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    return data.decode("utf-8", errors="replace").splitlines()[-lines:]
+
+
+def collect(log_lines: int = LOG_TAIL_LINES) -> Dict[str, Any]:
+    """
+    Collect the diagnostics data for a bug report.
+
+    Args:
+        log_lines (int): Number of log lines to include
+
+    Returns:
+        dict: Timings, event counts, provider state and the log tail
+    """
+    with _lock:
+        event_counts = dict(_event_counts.most_common())
+
+    state = {}
+    for name, provider in list(_providers.items()):
+        try:
+            state[name] = provider()
+        except Exception as e:
+            logger.error(f"Diagnostics provider {name} failed: {e}")
+            state[name] = {"error": str(e)}
+
+    try:
+        log_tail = _read_log_tail(_log_file, log_lines)
+    except Exception as e:
+        log_tail = [f"Failed to read log: {e}"]
+
+    return {
+        "generated": datetime.datetime.now().isoformat(),
+        "session_seconds": round(time.time() - _session_start),
+        "timings": timing_summary(),
+        "event_counts": event_counts,
+        "state": state,
+        "log_tail": log_tail,
+    }
+
+
+def build_bundle(max_bytes: int = MAX_BUNDLE_BYTES) -> Tuple[str, bytes]:
+    """
+    Build a compressed diagnostics bundle, trimming the log tail to fit the size cap.
+
+    Returns:
+        tuple: (readable JSON preview, gzip-compressed JSON bytes)
+    """
+    log_lines = LOG_TAIL_LINES
+    while True:
+        data = collect(log_lines)
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        compressed = gzip.compress(text.encode("utf-8"))
+        if len(compressed) <= max_bytes or log_lines == 0:
+            return text, compressed
+        log_lines //= 2
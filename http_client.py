@@ -0,0 +1,147 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Configure logger
+logger = logging.getLogger("ArchitectTracker.HTTP")
+
+# Constants
+USER_AGENT = "EDMC-ArchitectTracker"
+CONNECT_TIMEOUT = 5  # seconds
+READ_TIMEOUT = 30  # seconds
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds, doubled on every retry
+BACKOFF_MAX = 30  # seconds
+MAX_CONCURRENT_REQUESTS = 4
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods that may be sent twice; others are only retried if the server never got them
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Shared session, created on first use
+_session = None
+_session_lock = threading.Lock()
+# Caps the number of requests in flight across all plugin features
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def get_session():
+    """
+    Get the shared HTTP session, creating it on first use.
+
+    The session keeps connections alive between requests, so repeated calls
+    to the same host (GitHub, Discord) skip the TCP and TLS handshakes.
+
+    Returns:
+        requests.Session: Shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT_REQUESTS, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+
+def _backoff_delay(attempt, retry_after=None):
+    """
+    Calculate how long to wait before the next attempt.
+
+    Args:
+        attempt (int): Number of the failed attempt (0-based)
+        retry_after (str): Retry-After header sent by the server, if any
+
+    Returns:
+        float: Delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0), BACKOFF_MAX)
+        except ValueError:
+            try:
+                return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0), BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    # Exponential backoff with jitter so several EDMC instances do not retry in lockstep
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _request_not_sent(error):
+    """True if a request failed before reaching the server (connect timeout, refused, DNS failure)."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)  # unwrapped from urllib3's MaxRetryError
+    return isinstance(reason, NewConnectionError)
+
+
+def _may_retry(method, error=None, status=None):
+    """Whether a failed attempt can be repeated without risking a duplicate (e.g. a webhook post)."""
+    if method.upper() in IDEMPOTENT_METHODS:
+        return True
+    if error is not None:
+        return _request_not_sent(error)
+    return status == 429
+
+
+def request(method, url, retries=MAX_RETRIES, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs):
+    """
+    Send an HTTP request through the shared session.
+
+    Connection errors, timeouts and 429/5xx replies are retried with jittered
+    exponential backoff (honouring Retry-After). Non-idempotent methods (POST)
+    are only retried when the server cannot have received them (connect
+    timeout, connection refused) or answered 429; their callers handle other
+    failures. For streamed responses only establishing the request counts
+    towards the concurrency cap.
+
+    Args:
+        method (str): HTTP method
+        url (str): Request URL
+        retries (int): Number of retries after the first attempt (0 leaves retrying to the caller)
+        timeout (tuple): (connect, read) timeouts in seconds
+        **kwargs: Passed on to requests.Session.request()
+
+    Returns:
+        requests.Response: The final response (may still be an error status)
+
+    Raises:
+        requests.exceptions.RequestException: If the last attempt failed to connect
+    """
+    for attempt in range(retries + 1):
+        with _request_slots:
+            try:
+                response = get_session().request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == retries or not _may_retry(method, error=e):
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if (response.status_code not in RETRY_STATUSES or attempt == retries
+                        or not _may_retry(method, status=response.status_code)):
+                    return response
+                delay = _backoff_delay(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    """Send a GET request through the shared session (see request())."""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """Send a POST request through the shared session (see request())."""
+    return request("POST", url, **kwargs)
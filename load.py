@@ -4,28 +4,44 @@ import logging
 import tkinter as tk
 from tkinter import ttk, messagebox
 from contextlib import suppress
+from collections import Counter
 from companion import CAPIData
-import binascii
 from config import config
 # Don't import theme to avoid any interference with EDMC's theming system
 import theme  # Import as module to avoid namespace conflicts
 from typing import Optional
 import threading
+import time
 
 # Import settings functionality
 from settings import USER_DIR, load_gui_settings, save_gui_settings, get_skipped_version, save_skipped_version
 from GUI_settings import SettingsWindow
+from theme_styles import build_style_sets, apply_style_set
 import updater
+import bug_report
+import diagnostics
+import construction_store
+import commodities
+import site_archive
+from carrier_registry import CarrierRegistry
 
 # Global GUI instance
 ARCHITECT_GUI = None
 frame: Optional[tk.Frame] = None
+# The startup update check only runs once per EDMC session
+startup_update_check_scheduled = False
 
 SAVE_FILE = os.path.join(USER_DIR, "construction_requirements.json")
 LOG_FILE = os.path.join(USER_DIR, "EDMC_Architect_Log.txt")
-CARRIER_FILE = os.path.join(USER_DIR, "fleet_carrier_cargo.json")
 MARKET_JSON = os.path.join(os.getenv('USERPROFILE', os.path.expanduser('~')), 'Saved Games', 'Frontier Developments', 'Elite Dangerous', 'Market.json')
 CARGO_JSON = os.path.join(os.getenv('USERPROFILE', os.path.expanduser('~')), 'Saved Games', 'Frontier Developments', 'Elite Dangerous', 'Cargo.json')
+# Station dropdown entry showing the summed needs of all sites in the system filter
+ALL_SITES_LABEL = "All sites"
+ALL_SITES = object()
+# Sites not updated or visited for this many days are archived (0 = never)
+DEFAULT_AUTO_ARCHIVE_DAYS = 30
+# Delay merging refresh requests from frequent updates (Status.json)
+REFRESH_DEBOUNCE_MS = 500
 # Files for saving data and settings
 SAVE_FILE     = os.path.join(USER_DIR, "construction_requirements.json")   
 LOG_FILE      = os.path.join(USER_DIR, "EDMC_Architect_Log.txt")           
@@ -42,6 +58,7 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(formatter)
 if not logger.hasHandlers():
     logger.addHandler(file_handler)
+diagnostics.set_log_file(LOG_FILE)
 
 
 
@@ -50,110 +67,44 @@ if not logger.hasHandlers():
 # Settings management is now in settings.py
 
 
-# --- Helpers ---
-def decode_vanity_name(hex_string):
-    try:
-        return binascii.unhexlify(hex_string).decode('utf-8')
-    except Exception as e:
-        logger.error(f"Failed to decode vanity name: {e}")
-        return hex_string
-
-# --- Fleet Carrier Cargo Tracker ---
-class FleetCarrierCargoTracker:
-    def __init__(self):
-        self.commodities = {}
-        self.carrier_name = ""
-        self.callsign = ""
-        self.load()
-
-    def update(self, data):
-        cargo_items = data.get('cargo', [])
-        if not isinstance(cargo_items, list):
-            logger.warning("Unexpected cargo data format.")
-            return
-        self.commodities.clear()
-        for item in cargo_items:
-            name = item.get("commodity")
-            qty = item.get("qty", 0)
-            if not name:
-                logger.warning("Missing commodity name in cargo item: %s", item)
-                continue
-            self.commodities[name] = self.commodities.get(name, 0) + qty
-
-        carrier_info = data.get("name", {})
-        hex_name = carrier_info.get("vanityName")
-        self.carrier_name = decode_vanity_name(hex_name) if hex_name else "Unnamed Carrier"
-        self.callsign = carrier_info.get("callsign", "")
-        self.save()
-
-    def apply_transfer_event(self, transfers):
-        for transfer in transfers:
-            name = transfer.get("Type").capitalize()
-            qty = transfer.get("Count", 0)
-            direction = transfer.get("Direction")
-            if not name or qty <= 0 or direction not in ("tocarrier", "toship"):
-                continue
-            current = self.commodities.get(name, 0)
-            if direction == "tocarrier":
-                self.commodities[name] = current + qty
-            else:
-                self.commodities[name] = max(0, current - qty)
-        self.save()
-
-    def get_quantity(self, commodity_name):
-        return self.commodities.get(commodity_name.capitalize(), 0)
-
-    def save(self):
-        try:
-            with open(CARRIER_FILE, "w", encoding="utf-8") as f:
-                json.dump({
-                    "carrier_name": self.carrier_name,
-                    "callsign": self.callsign,
-                    "commodities": self.commodities
-                }, f, indent=4)
-        except Exception as e:
-            logger.error("Error saving fleet carrier cargo: %s", e)
-
-    def load(self):
-        if not os.path.exists(CARRIER_FILE):
-            return
-        try:
-            with open(CARRIER_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.carrier_name = data.get("carrier_name", "")
-                self.callsign = data.get("callsign", "")
-                self.commodities = data.get("commodities", {})
-        except Exception as e:
-            logger.error("Error loading fleet carrier cargo: %s", e)
-
-carrier_tracker = FleetCarrierCargoTracker()
+# --- Fleet Carriers ---
+carrier_registry = CarrierRegistry()
+carrier_registry.load()
 
 # --- Requirement persistence ---
+# Construction sites keyed by MarketID, loaded on first use
+construction_data = construction_store.ConstructionStore(SAVE_FILE, site_archive.ARCHIVE_FILE)
+
 def is_station_complete(materials):
     return all(info["ProvidedAmount"] >= info["RequiredAmount"] for info in materials.values())
 
 
-def save_facility_requirements(materials, station_name,system):
+@diagnostics.timed("save_facility_requirements")
+def save_facility_requirements(materials, station_name, system, market_id=None, complete=False):
     global ARCHITECT_GUI
-    try:
-        with open(SAVE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, dict):
-            data = {}
-    except Exception:
-        data = {}
-
-    if is_station_complete(materials):
-        data.pop(station_name, None)
-    else:
-         data[station_name] = {
-            "system": system,
-            "materials": materials
-        }
+    load_facility_requirements()
+
+    if complete or is_station_complete(materials):
+        if market_id is None:
+            tracked = construction_data.resolve(None, station_name)
+        else:
+            tracked = construction_data.resolve_market(market_id, station_name, system)
+        if tracked is None:
+            return
+    elif construction_data.is_unchanged(market_id, station_name, materials):
+        # The depot repeats its snapshot while docked; nothing to write or redraw
+        # (only keep the site from going stale)
+        if construction_data.touch(construction_data.resolve(market_id, station_name)):
+            try:
+                construction_data.save()
+            except Exception as e:
+                logger.error("Error saving data: %s", e)
+        return
+    construction_data.upsert(market_id, station_name, system, materials, complete)
 
     try:
-        with open(SAVE_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        # Completed sites are dropped here, when writing
+        construction_data.save()
     except Exception as e:
         logger.error("Error saving data: %s", e)
 
@@ -161,35 +112,93 @@ def save_facility_requirements(materials, station_name,system):
         ARCHITECT_GUI.refresh()
 
 
-def load_facility_requirements():
-    if not os.path.exists(SAVE_FILE):
-        return {}
-    try:
-        with open(SAVE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        logger.error("Error reading save file: %s", e)
-        return {}
-    cleaned = {s: info for s, info in data.items() if not is_station_complete(info.get("materials", {}))}
-    if cleaned != data:
+def needed_commodities():
+    """IDs of the commodities any tracked site still needs."""
+    load_facility_requirements()
+    total = construction_data.aggregate(list(construction_data.snapshot.sites))
+    return {cid for cid, required, provided in total.rows() if provided < required}
+
+
+def carrier_label_text():
+    """Names of the selected carriers and how long ago CAPI last confirmed their cargo."""
+    names = ", ".join(carrier_registry.carrier_names())
+    if not names:
+        return 'N/A'
+    synced = carrier_registry.last_synced()
+    if synced is None:
+        return f"{names} (not synced)"
+    hours = int((time.time() - synced) // 3600)
+    return f"{names} (synced {hours}h ago)" if hours else f"{names} (synced)"
+
+
+def archive_stale_sites():
+    """Archive sites not updated for the configured number of days."""
+    load_facility_requirements()
+    if construction_data.stale_sites():
         try:
-            with open(SAVE_FILE, "w", encoding="utf-8") as f:
-                json.dump(cleaned, f, indent=4)
+            construction_data.save()
         except Exception as e:
-            logger.error("Error writing cleaned data: %s", e)
-    return cleaned
+            logger.error("Error archiving stale sites: %s", e)
+
+
+@diagnostics.timed("load_facility_requirements")
+def load_facility_requirements():
+    """Return the current read-only snapshot of the unfinished sites, loading them from disk on first use."""
+    if not construction_data.loaded:
+        construction_data.load()
+    return construction_data.snapshot.sites
 
 
 def load_market_data():
     if not os.path.exists(MARKET_JSON):
-        return [], None
+        return [], None, None
     try:
         with open(MARKET_JSON, "r", encoding="utf-8") as f:
             market = json.load(f)
-        return market.get("Items", []), market.get("StationName")
+        return market.get("Items", []), market.get("StationName"), market.get("MarketID")
     except Exception as e:
         logger.error("Error loading market data: %s", e)
-        return [], None
+        return [], None, None
+
+
+# --- Market Model ---
+class MarketModel:
+    """Stock of the last visited market, read on Market events and adjusted by trades."""
+
+    def __init__(self):
+        self.market_id = None
+        self.station_name = None
+        self.items = {}  # commodity ID -> Market.json item
+        self.loaded = False
+
+    def reload(self):
+        """Read Market.json."""
+        items, self.station_name, self.market_id = load_market_data()
+        self.items = {commodities.commodity_id(i['Name']): i for i in items if i.get('Name')}
+        self.loaded = True
+
+    def apply_trade(self, market_id, commodity_type, stock_delta):
+        """
+        Apply a MarketBuy/MarketSell to the stock.
+
+        Args:
+            market_id (int): MarketID from the event
+            commodity_type (str): Type from the event (e.g. "steel")
+            stock_delta (int): Change of the market's stock
+
+        Returns:
+            int: ID of the changed commodity, or None if the trade is not on this market
+        """
+        if not self.loaded or market_id is None or market_id != self.market_id or not commodity_type:
+            return None
+        cid = commodities.find(commodity_type)
+        item = self.items.get(cid)
+        if item is None:
+            return None
+        item['Stock'] = max(0, item.get('Stock', 0) + stock_delta)
+        return cid
+
+market_model = MarketModel()
 
 
 
@@ -200,10 +209,8 @@ def get_construction_system_name(self):
     if not full:
         return 'N/A'
 
-    # In save_facility_requirements you stored "system" under the full key
-    entry = self.data.get(full, {})
-    system_name = entry.get('system')
-    return system_name or 'N/A'
+    site = self.data.get(full)
+    return (site.system if site else None) or 'N/A'
 
 
 
@@ -220,11 +227,129 @@ def load_cargo_data():
         logger.error("Error loading cargo data: %s", e)
         return []
 
+# --- Ship Cargo View ---
+class ShipCargoView:
+    """
+    Ship cargo by commodity, adjusted by deliveries between Cargo events.
+
+    Prefers the cargo EDMC keeps in the state passed to journal_entry and
+    reads Cargo.json only until the first state snapshot arrives.
+    """
+
+    def __init__(self):
+        self._counts = None  # commodity ID -> count, None until read
+        self._state_cargo = None  # last state['Cargo'] snapshot from EDMC
+
+    def update_state(self, cargo):
+        """
+        Take EDMC's state['Cargo'] if it changed since the last hook call.
+
+        Returns:
+            bool: True if the snapshot replaced the current counts
+        """
+        if cargo is None or cargo == self._state_cargo:
+            return False
+        self._state_cargo = dict(cargo)
+        self._counts = None
+        return True
+
+    def invalidate(self):
+        """Forget local adjustments; counts are rebuilt from the last snapshot on next use."""
+        self._counts = None
+
+    @property
+    def counts(self):
+        if self._counts is None:
+            counts = {}
+            if self._state_cargo is not None:
+                for name, count in self._state_cargo.items():
+                    cid = commodities.commodity_id(name)
+                    counts[cid] = counts.get(cid, 0) + count
+            else:
+                for item in load_cargo_data():
+                    if not item.get('Name'):
+                        continue
+                    cid = commodities.commodity_id(item['Name'])
+                    counts[cid] = counts.get(cid, 0) + item.get('Count', 0)
+            self._counts = counts
+        return self._counts
+
+    def get_quantity(self, cid):
+        return self.counts.get(cid, 0)
+
+    def remove(self, cid, amount):
+        """Take delivered cargo out of the view."""
+        counts = self.counts
+        if cid in counts:
+            counts[cid] = max(0, counts[cid] - amount)
+
+    def total(self):
+        return sum(self.counts.values())
+
+ship_cargo = ShipCargoView()
+
+# --- Status Snapshot ---
+class StatusSnapshot:
+    """Last Status.json values passed to dashboard_entry (cargo tonnage and docked flag)."""
+    FLAG_DOCKED = 1 << 0
+
+    def __init__(self):
+        self.cargo = None  # tons, None until the first dashboard update
+        self.docked = None
+
+    def update(self, entry):
+        """
+        Store a dashboard entry.
+
+        Returns:
+            tuple: (cargo changed, docked state changed)
+        """
+        cargo = entry.get('Cargo')
+        flags = entry.get('Flags')
+        cargo_changed = False
+        docked_changed = False
+        if cargo is not None:
+            cargo = int(round(cargo))
+            cargo_changed = cargo != self.cargo
+            self.cargo = cargo
+        if flags is not None:
+            docked = bool(flags & self.FLAG_DOCKED)
+            docked_changed = self.docked is not None and docked != self.docked
+            self.docked = docked
+        return cargo_changed, docked_changed
+
+status_snapshot = StatusSnapshot()
+
 def get_total_ship_cargo():
     """Calculate the total amount of cargo currently in the ship."""
-    cargo_items = load_cargo_data()
-    total_cargo = sum(item.get('Count', 0) for item in cargo_items)
-    return total_cargo
+    if status_snapshot.cargo is not None:
+        return status_snapshot.cargo
+    return ship_cargo.total()
+
+def diagnostics_state():
+    """State sizes included in bug report diagnostics bundles."""
+    file_sizes = {}
+    for label, path in (("construction_requirements.json", SAVE_FILE),
+                        ("Market.json", MARKET_JSON),
+                        ("Cargo.json", CARGO_JSON)):
+        try:
+            file_sizes[label] = os.path.getsize(path)
+        except OSError:
+            file_sizes[label] = None
+    
+    # Runs on the bug report thread: read the published snapshots only
+    carriers = carrier_registry.snapshot
+    tracked_sites = len(construction_data.snapshot.sites)
+    
+    return {
+        "file_sizes": file_sizes,
+        "tracked_sites": tracked_sites,
+        "carriers": len(carriers.carriers),
+        "carrier_commodities": len(carriers.totals),
+        "carrier_drift": carrier_registry.drift_summary()
+    }
+
+diagnostics.register_provider("tracker", diagnostics_state)
 
 # --- GUI Definition ---
 class ArchitectTrackerGUI(tk.Toplevel):
@@ -273,6 +398,12 @@ class ArchitectTrackerGUI(tk.Toplevel):
         }
     }
     
+    # Names of the prebuilt ttk style set for each theme (e.g. Dark.Treeview)
+    THEME_STYLE_PREFIX = {
+        THEME_BLACK: "Dark",
+        THEME_WHITE: "Light"
+    }
+    
     # Legacy color definitions (kept for backward compatibility)
     edBlue = "#1fbeff"
     edOrange = "#ff8500"
@@ -287,9 +418,17 @@ class ArchitectTrackerGUI(tk.Toplevel):
         self.sort_by_system   = settings.get('sort_by_system', False)         # Sort stations by system
         self.selected_system  = settings.get('selected_system', "All Systems")  # Filter by system
         self.cargo_capacity   = settings.get('cargo_capacity', 720)           # Default cargo capacity (Type-9)
+        self.auto_archive_days = settings.get('auto_archive_days', DEFAULT_AUTO_ARCHIVE_DAYS)
         
         # Store settings window reference for theme updates
         self.settings_window = None
+
+        # Displayed site and its tree rows, for updating single rows
+        self.displayed_site = None
+        self.row_ids = {}  # commodity ID -> tree item id
+        self.market_lookup = {}
+        # Pending debounced refresh (see request_refresh)
+        self.refresh_job = None
         
         # Use user preference if set, otherwise default to WHITE theme for main window
         if 'current_theme' in settings:
@@ -310,83 +449,36 @@ class ArchitectTrackerGUI(tk.Toplevel):
             {c: True for c in cols}
         )
 
-        self.setStyle()
-        
-
         if not os.path.exists(SAVE_FILE):
             self._build_info_widgets()
         else:
             self._build_widgets()
             self.refresh()
 
+        self.setStyle()
+
     def setStyle(self):
-        # Main window theme
-        main_theme_colors = self.THEME_COLORS[self.current_theme]
-        # Materials frame theme
-        materials_theme_colors = self.THEME_COLORS[self.materials_theme]
-        
-        style = ttk.Style()
-        style.theme_use("default")
+        """Point the window's widgets at the style sets of the selected themes.
         
-        # Configure TreeView with materials theme
-        style.configure("Treeview",
-                        background=materials_theme_colors["background"],
-                        foreground=materials_theme_colors["foreground"],
-                        rowheight=24,
-                        fieldbackground=materials_theme_colors["background"])
-        style.configure("Heading",
-                        background=materials_theme_colors["background"],
-                        foreground=materials_theme_colors["foreground"])
-        style.map("Treeview",
-                  foreground=[("selected", materials_theme_colors["highlight"])])
-                  
-        # Configure TButton style based on main theme
-        style.configure("TButton",
-                       background=main_theme_colors["button_bg"],
-                       foreground=main_theme_colors["button_fg"])
-        style.map("TButton",
-                  background=[("active", main_theme_colors["highlight"])],
-                  foreground=[("active", main_theme_colors["button_fg"])])
+        The style sets are built once; switching themes only re-points widgets
+        and recolours the row tags, without reloading or rebuilding any data.
+        """
+        build_style_sets(self.THEME_COLORS, self.THEME_STYLE_PREFIX)
         
-        # Configure TLabel style based on main theme
-        style.configure("TLabel",
-                       background=main_theme_colors["background"],
-                       foreground=main_theme_colors["label_fg"])
-                       
-        # Configure TEntry style for text fields
-        style.configure("TEntry",
-                       fieldbackground=main_theme_colors["background"],
-                       foreground=main_theme_colors["foreground"])
-        style.map("TEntry",
-                 fieldbackground=[("active", main_theme_colors["background"])])
-                       
-        # Materials frame specific style (for frame backgrounds)
-        style.configure("Materials.TFrame", 
-                       background=materials_theme_colors["background"])
+        # Main window theme (this includes the settings window and dialogs)
+        self.configure(bg=self.THEME_COLORS[self.current_theme]["background"])
+        apply_style_set(self, self.THEME_STYLE_PREFIX[self.current_theme])
         
-        # Main window specific style
-        style.configure("Main.TFrame",
-                       background=main_theme_colors["background"])
-                       
-        # Configure TCheckbutton style
-        style.configure("TCheckbutton",
-                       background=main_theme_colors["background"],
-                       foreground=main_theme_colors["foreground"])
-        style.map("TCheckbutton",
-                  background=[("active", main_theme_colors["background"])],
-                  foreground=[("active", main_theme_colors["highlight"])])
-                  
-        # Configure TRadiobutton style
-        style.configure("TRadiobutton",
-                       background=main_theme_colors["background"],
-                       foreground=main_theme_colors["foreground"])
-        style.map("TRadiobutton",
-                  background=[("active", main_theme_colors["background"])],
-                  foreground=[("active", main_theme_colors["highlight"])])
+        # Materials frame theme
+        self.apply_materials_style()
 
+    def apply_materials_style(self):
+        """Point the materials frame at the materials theme style set and recolour rows."""
+        if not hasattr(self, 'materials_frame'):
+            return
+        apply_style_set(self.materials_frame, self.THEME_STYLE_PREFIX[self.materials_theme])
         # Configure TreeView tags for intelligent row shading
-        if hasattr(self, 'tree'):
-            self.initializeTreeViewTags()
+        self.initializeTreeViewTags()
 
     def _build_info_widgets(self):
         frame = ttk.Frame(self, padding=10, style="Main.TFrame")
@@ -449,6 +541,7 @@ class ArchitectTrackerGUI(tk.Toplevel):
         # Materials frame with materials theme
         materials_frame = ttk.Frame(frame, style="Materials.TFrame")
         materials_frame.grid(row=3, column=0, columnspan=8, sticky="nsew")
+        self.materials_frame = materials_frame
         
         self.tree = ttk.Treeview(materials_frame, columns=cols, show="headings")
         for c in cols:
@@ -495,18 +588,25 @@ class ArchitectTrackerGUI(tk.Toplevel):
         self.tree.tag_configure('noDelivery', background=no_delivery_bg)
 
 
-    def toggle_column(self, column, is_visible: bool):
-        self.column_visibility[column] = is_visible
-        self.refresh_columns()
-        save_gui_settings({
+    def save_settings(self):
+        """Write the window's settings, keeping the other keys of the settings file (window state, skipped version)."""
+        settings = load_gui_settings()
+        settings.update({
             'column_visibility': self.column_visibility,
             'hide_provided': self.hide_provided,
             'sort_by_system': self.sort_by_system,
             'selected_system': self.selected_system,
             'current_theme': self.current_theme,
             'materials_theme': self.materials_theme,
-            'cargo_capacity': self.cargo_capacity
+            'cargo_capacity': self.cargo_capacity,
+            'auto_archive_days': self.auto_archive_days
         })
+        save_gui_settings(settings)
+
+    def toggle_column(self, column, is_visible: bool):
+        self.column_visibility[column] = is_visible
+        self.refresh_columns()
+        self.save_settings()
 
     def toggle_hide_provided(self, value=None):
         """Toggle hide provided setting."""
@@ -518,27 +618,12 @@ class ArchitectTrackerGUI(tk.Toplevel):
         else:
             self.hide_provided = self.hide_var.get()
         self.refresh()
-        save_gui_settings({
-            'column_visibility': self.column_visibility,
-            'hide_provided': self.hide_provided,
-            'sort_by_system': self.sort_by_system,
-            'selected_system': self.selected_system,
-            'current_theme': self.current_theme,
-            'materials_theme': self.materials_theme,
-            'cargo_capacity': self.cargo_capacity
-        })
+        self.save_settings()
 
     def toggle_sort_mode(self):
         self.sort_by_system = self.sort_var.get()
         self.refresh()
-        save_gui_settings({
-            'column_visibility': self.column_visibility,
-            'hide_provided': self.hide_provided,
-            'sort_by_system': self.sort_by_system,
-            'selected_system': self.selected_system,
-            'current_theme': self.current_theme,
-            'cargo_capacity': self.cargo_capacity
-        })
+        self.save_settings()
     
     def update_cargo_capacity(self, value=None):
         """Update cargo capacity setting."""
@@ -559,14 +644,7 @@ class ArchitectTrackerGUI(tk.Toplevel):
             self.cargo_capacity = capacity
             self.display_station()  # Update display to reflect new capacity
             
-            save_gui_settings({
-                'column_visibility': self.column_visibility,
-                'hide_provided': self.hide_provided,
-                'sort_by_system': self.sort_by_system,
-                'selected_system': self.selected_system,
-                'current_theme': self.current_theme,
-                'cargo_capacity': self.cargo_capacity
-            })
+            self.save_settings()
             
             # Add logging to help debug
             logger.info(f"Cargo capacity updated to: {capacity}")
@@ -580,14 +658,7 @@ class ArchitectTrackerGUI(tk.Toplevel):
     def filter_by_system(self):
         self.selected_system = self.system_var.get()
         self.refresh()
-        save_gui_settings({
-            'column_visibility': self.column_visibility,
-            'hide_provided': self.hide_provided,
-            'sort_by_system': self.sort_by_system,
-            'selected_system': self.selected_system,
-            'current_theme': self.current_theme,
-            'cargo_capacity': self.cargo_capacity
-        })
+        self.save_settings()
 
     def change_theme(self, value=None):
         """Change the application theme when a different theme is selected"""
@@ -601,29 +672,15 @@ class ArchitectTrackerGUI(tk.Toplevel):
             # Called from main window UI
             self.current_theme = self.theme_var.get()
             
-        # Update window background color
-        self.configure(bg=self.THEME_COLORS[self.current_theme]["background"])
-        
-        # Apply new style
+        # Re-point widgets at the new style set; no data needs reloading
         self.setStyle()
         
-        # Force refresh the UI to apply new theme colors
-        self.refresh()
-        
         # Update settings window if it exists
         if self.settings_window and self.settings_window.winfo_exists():
             self.settings_window.update_theme()
         
         # Save settings
-        save_gui_settings({
-            'column_visibility': self.column_visibility,
-            'hide_provided': self.hide_provided,
-            'sort_by_system': self.sort_by_system,
-            'selected_system': self.selected_system,
-            'current_theme': self.current_theme,  # Explicitly save user's theme preference
-            'materials_theme': self.materials_theme,
-            'cargo_capacity': self.cargo_capacity
-        })
+        self.save_settings()
         
         # Add logging to help debug
         logger.info(f"Main window - Changed theme to: {self.current_theme}")
@@ -640,26 +697,15 @@ class ArchitectTrackerGUI(tk.Toplevel):
             # Called from main window UI
             self.materials_theme = self.materials_theme_var.get()
         
-        # Apply new style
-        self.setStyle()
-        
-        # Force refresh the UI to apply new theme colors
-        self.refresh()
+        # Re-point the materials frame and recolour rows; no data needs reloading
+        self.apply_materials_style()
         
         # Update settings window if it exists
         if self.settings_window and self.settings_window.winfo_exists():
             self.settings_window.update_theme()
         
         # Save settings
-        save_gui_settings({
-            'column_visibility': self.column_visibility,
-            'hide_provided': self.hide_provided,
-            'sort_by_system': self.sort_by_system,
-            'selected_system': self.selected_system,
-            'current_theme': self.current_theme,
-            'materials_theme': self.materials_theme,  # Save materials theme preference
-            'cargo_capacity': self.cargo_capacity
-        })
+        self.save_settings()
         
         # Add logging to help debug
         logger.info(f"Main window - Changed materials theme to: {self.materials_theme}")
@@ -668,15 +714,25 @@ class ArchitectTrackerGUI(tk.Toplevel):
     
     def open_settings(self):
         """Open the settings window to configure plugin options."""
-        # Close existing settings window if open
+        # Reuse the hidden settings window instead of rebuilding it
         if self.settings_window and self.settings_window.winfo_exists():
-            self.settings_window.destroy()
+            self.settings_window.sync_settings(
+                current_theme=self.current_theme,
+                materials_theme=self.materials_theme,
+                column_visibility=self.column_visibility,
+                hide_provided=self.hide_provided,
+                sort_by_system=self.sort_by_system,
+                cargo_capacity=self.cargo_capacity
+            )
+            self.settings_window.show()
+            return
             
         # Create a dictionary with theme constants
         theme_constants = {
             "THEME_COLORS": self.THEME_COLORS,
             "THEME_BLACK": self.THEME_BLACK,
-            "THEME_WHITE": self.THEME_WHITE
+            "THEME_WHITE": self.THEME_WHITE,
+            "THEME_STYLE_PREFIX": self.THEME_STYLE_PREFIX
         }
             
         # Create new settings window with proper theme
@@ -692,7 +748,10 @@ class ArchitectTrackerGUI(tk.Toplevel):
             hide_provided=self.hide_provided,
             sort_by_system=self.sort_by_system,
             cargo_capacity=self.cargo_capacity,
-            data=self.data,
+            station_index_provider=lambda: self.station_index,
+            archive_provider=site_archive.read_records,
+            carriers_provider=self.carrier_choices,
+            auto_archive_days=self.auto_archive_days,
             
             # Callback functions
             toggle_column_callback=self.toggle_column,
@@ -700,10 +759,48 @@ class ArchitectTrackerGUI(tk.Toplevel):
             toggle_sort_mode_callback=self.toggle_sort_mode,
             update_cargo_capacity_callback=self.update_cargo_capacity,
             remove_station_callback=self.remove_station,
+            restore_site_callback=self.restore_archived_site,
+            select_carrier_callback=self.select_carrier,
+            update_auto_archive_days_callback=self.update_auto_archive_days,
             change_theme_callback=self.change_theme,
             change_materials_theme_callback=self.change_materials_theme
         )
         
+    def carrier_choices(self):
+        """Known carriers as (callsign, name, selected), for the settings window."""
+        return [(callsign, view.carrier_name, view.selected)
+                for callsign, view in sorted(carrier_registry.snapshot.carriers.items())]
+
+    def select_carrier(self, callsign, selected):
+        """Include or exclude a carrier from the Carrier Qty column."""
+        carrier_registry.set_selected(callsign, selected)
+        self.refresh()
+
+    def restore_archived_site(self, record):
+        """Move an archived site back into tracking."""
+        try:
+            site_id = construction_data.restore(record)
+            if site_id is None:
+                tk.messagebox.showinfo("Restore", "This station is already being tracked again; "
+                                       "its current data was kept.", parent=self)
+                return
+            construction_data.save()
+            site_archive.append([site_archive.restored_record(site_id, record.get("name", ""))])
+        except Exception as e:
+            logger.error(f"Error restoring site: {e}")
+            tk.messagebox.showerror("Error", f"Failed to restore station: {e}", parent=self)
+            return
+        self.refresh()
+
+    def update_auto_archive_days(self, days):
+        """Change how many days without updates archive a site (0 = never)."""
+        self.auto_archive_days = max(0, days)
+        construction_data.max_age_days = self.auto_archive_days
+        self.save_settings()
+        logger.info(f"Auto-archive after {self.auto_archive_days} days")
+        archive_stale_sites()
+        self.refresh()
+
     def remove_station(self, full_station_key=None):
         """Remove a station from tracking.
         
@@ -726,13 +823,8 @@ class ArchitectTrackerGUI(tk.Toplevel):
             tk.messagebox.showerror("Error", "Could not identify the selected station", parent=self)
             return
         
-        # Extract station display name (for confirmation message)
-        if ':' in full_station_key:
-            station_display = full_station_key.split(':', 1)[-1].strip()
-        elif ';' in full_station_key:
-            station_display = full_station_key.split(';', 1)[-1].strip()
-        else:
-            station_display = full_station_key
+        site = self.data.get(full_station_key)
+        station_display = construction_store.display_name(site.name) if site else str(full_station_key)
             
         # Confirm removal
         if not tk.messagebox.askyesno("Confirm Removal", 
@@ -742,28 +834,16 @@ class ArchitectTrackerGUI(tk.Toplevel):
             
         # Remove from saved data
         try:
-            with open(SAVE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                
-            if full_station_key in data:
-                del data[full_station_key]
-                
+            if construction_data.remove(full_station_key):
                 # Save updated data
-                with open(SAVE_FILE, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
+                construction_data.save()
                     
                 # Log successful removal
                 logger.info(f"Successfully removed station '{station_display}' with key '{full_station_key}'")
                 
-                # Update UI
+                # Update UI (this also refreshes the settings window's station lists)
                 self.refresh()
                 
-                # Close settings window
-                for widget in self.winfo_children():
-                    if isinstance(widget, tk.Toplevel) and widget.title() == "Settings":
-                        widget.destroy()
-                        break
-                
                 tk.messagebox.showinfo("Success", f"Station '{station_display}' removed from tracking.", parent=self)
             else:
                 logger.warning(f"Station key '{full_station_key}' not found in data file")
@@ -779,6 +859,7 @@ class ArchitectTrackerGUI(tk.Toplevel):
             self.tree.heading(col, text=col)
             self.tree.column(col, width=100)
 
+    @diagnostics.timed("refresh")
     def refresh(self):
         # Zapamiętaj aktualnie wybraną nazwę stacji
         current_selection = self.station_var.get()
@@ -787,16 +868,24 @@ class ArchitectTrackerGUI(tk.Toplevel):
         data = load_facility_requirements()
         self.data = data
         
-        # Extract all unique system names
-        systems = set()
-        for station, info in data.items():
-            system_name = info.get('system', 'Unknown')
-            if system_name:
-                systems.add(system_name)
+        # Index all stations by system once; the settings window reads the same index
+        station_index = {"All Systems": []}
+        name_counts = Counter(construction_store.display_name(site.name) for site in data.values())
+        for full, site in data.items():
+            system_name = site.system or 'Unknown'
+            name = construction_store.display_name(site.name)
+            if name_counts[name] > 1:
+                # Same station name in several systems
+                name = f"{name} ({system_name})"
+            station_index.setdefault(system_name, []).append((name, full))
+            station_index["All Systems"].append((name, full))
+        for stations in station_index.values():
+            stations.sort(key=lambda x: x[0])  # Sortuj alfabetycznie
+        self.station_index = station_index
         
         # Prepare system dropdown
         current_system = self.system_var.get()
-        system_values = ["All Systems"] + sorted(list(systems))
+        system_values = ["All Systems"] + sorted(s for s in station_index if s != "All Systems")
         self.system_dropdown['values'] = system_values
         
         # Restore system selection if possible
@@ -807,21 +896,12 @@ class ArchitectTrackerGUI(tk.Toplevel):
             self.selected_system = "All Systems"
 
         # Przygotuj dane do wyświetlenia
-        display = [
-            (
-              (full.split(':', 1)[-1].strip() if ':' in full else 
-               full.split(';', 1)[-1].strip() if ';' in full else full),
-              full
-            )
-            for full in data
-            if self.selected_system == "All Systems" or 
-               self.data.get(full, {}).get('system', '') == self.selected_system
-        ]
-        # Sort based on user preference
+        display = list(station_index.get(self.selected_system, []))
+        # Sort by system then station if requested (lists are already alphabetical)
         if self.sort_by_system:
-            display.sort(key=lambda x: (self.data.get(x[1], {}).get('system', ''), x[0]))  # Sort by system then station
-        else:
-            display.sort(key=lambda x: x[0])  # Sortuj alfabetycznie
+            display.sort(key=lambda x: (self.data[x[1]].system or 'Unknown', x[0]))
+        if len(display) > 1:
+            display.insert(0, (ALL_SITES_LABEL, ALL_SITES))
         self.station_map = {name: full for name, full in display}
 
         # Zaktualizuj dropdown
@@ -844,31 +924,21 @@ class ArchitectTrackerGUI(tk.Toplevel):
             self.transport_label['text'] = ""
             self.cargo_label['text'] = ""
 
-    def calculate_completion_percentage(self, materials):
+        # Keep the (possibly hidden) settings window in sync with the new index
+        if self.settings_window and self.settings_window.winfo_exists():
+            self.settings_window.refresh_stations()
+
+    def calculate_completion_percentage(self, site):
         """Calculate the percentage of completion based on provided vs required materials"""
-        total_required = 0
-        total_provided = 0
-        
-        for mat, vals in materials.items():
-            req = vals['RequiredAmount']
-            prov = vals['ProvidedAmount']
-            total_required += req
-            total_provided += min(prov, req)  # Don't count excess materials
-        
+        total_required = site.total_required()
         if total_required == 0:
             return 100.0  # Avoid division by zero
             
-        return (total_provided / total_required) * 100.0
+        return (site.total_provided() / total_required) * 100.0
         
-    def calculate_required_trips(self, materials):
+    def calculate_required_trips(self, site):
         """Calculate the estimated number of trips needed based on cargo capacity"""
-        total_needed = 0
-        for mat, vals in materials.items():
-            req = vals['RequiredAmount']
-            prov = vals['ProvidedAmount']
-            if prov < req:  # Only count materials that aren't fully provided
-                total_needed += (req - prov)
-        
+        total_needed = site.total_needed()
         if total_needed <= 0:
             return 0
         
@@ -876,73 +946,126 @@ class ArchitectTrackerGUI(tk.Toplevel):
         trips = (total_needed + self.cargo_capacity - 1) // self.cargo_capacity
         return max(1, trips)
         
+    @diagnostics.timed("display_station")
     def display_station(self):
         self.tree.delete(*self.tree.get_children())
+        self.row_ids = {}
         sel = self.station_var.get()
         full = self.station_map.get(sel)
-        if not full:
+        self.displayed_site = full
+        site = self._site_record(full)
+        if site is None:
             self.transport_label['text'] = ""
             return
-        materials = self.data[full]['materials']
-        market_items, market_name = load_market_data()
-        construction_system_name = get_construction_system_name(self)
-        cargo_items = load_cargo_data()
+        if not market_model.loaded:
+            market_model.reload()
 
-        # Calculate and display total ship cargo
-        total_cargo = get_total_ship_cargo()
-        self.cargo_label['text'] = f"Current Cargo: {total_cargo}/{self.cargo_capacity} tons"
+        self.market_lookup = market_model.items
 
-        market_lookup = {i.get('Name'): i for i in market_items}
-        cargo_lookup = {i.get('Name'): i for i in cargo_items}
-
-        self.market_name_label['text'] = market_name or 'N/A'
-        self.carrier_label['text'] = carrier_tracker.carrier_name or 'N/A'
+        self.market_name_label['text'] = market_model.station_name or 'N/A'
+        self.carrier_label['text'] = carrier_label_text()
 
         # First, filter materials that will be displayed based on hide_provided setting
-        visible_materials = []
-        for mat, vals in materials.items():
-            req = vals['RequiredAmount']
-            prov = vals['ProvidedAmount']
-            if not (self.hide_provided and prov >= req):  # Only add if it should be visible
-                visible_materials.append((mat, vals))
+        visible_materials = [row for row in site.rows()
+                             if not (self.hide_provided and row[2] >= row[1])]
 
         # Now iterate through only the visible materials with a proper counter for alternating colors
-        for idx, (mat, vals) in enumerate(visible_materials):
-            req = vals['RequiredAmount']
-            prov = vals['ProvidedAmount']
-            safeMat = mat.replace("$", "").replace("_name;", "")
-            locName = vals['Name_Localised']
-            need = req - prov
-            stock_qty = market_lookup.get(mat, {}).get('Stock', 0)
-            for_sale = f"✔ {stock_qty}" if stock_qty > 0 else ''
-            fc_qty = carrier_tracker.get_quantity(safeMat)
-            ship_qty = cargo_lookup.get(safeMat, {}).get('Count', 0)
-            short = max(0, need - (fc_qty + ship_qty))
-            
+        for idx, (cid, req, prov) in enumerate(visible_materials):
             # Assign base tag for alternating row colors
             base_tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-            
-            # Determine delivery status tag
-            if prov >= req:
-                status_tag = 'fullDelivery'  # Fully delivered
-            elif prov == 0:
-                status_tag = 'noDelivery'    # No deliveries yet
-            else:
-                status_tag = base_tag        # Partially delivered - use normal alternating colors
+            values, status_tag = self._material_row(cid, req, prov, base_tag)
             
             # Insert with appropriate tags - use BOTH tags in a tuple
-            self.tree.insert("", "end", values=(locName, req, prov, need, for_sale,
-                                                   fc_qty, ship_qty, short), tags=(base_tag, status_tag))
+            self.row_ids[cid] = self.tree.insert("", "end", values=values, tags=(base_tag, status_tag))
             
+        self._update_summary_labels(site)
+
+    def _site_record(self, key):
+        """Site shown for a station_map entry; the aggregate of the filtered sites for All sites."""
+        if key is ALL_SITES:
+            site_ids = [full for _, full in self.station_index.get(self.selected_system, [])]
+            return construction_data.aggregate(site_ids)
+        # The current snapshot, which may be newer than the one of the last refresh
+        return construction_data.snapshot.sites.get(key)
+
+    def _material_row(self, cid, req, prov, base_tag):
+        """Return (column values, status tag) of one material row."""
+        locName = commodities.display_name(cid)
+        need = req - prov
+        stock_qty = self.market_lookup.get(cid, {}).get('Stock', 0)
+        for_sale = f"✔ {stock_qty}" if stock_qty > 0 else ''
+        fc_qty = carrier_registry.get_quantity(cid)
+        ship_qty = ship_cargo.get_quantity(cid)
+        short = max(0, need - (fc_qty + ship_qty))
+        # "~" tracked from the journal since the last CAPI sync, "?" open market order
+        confidence = carrier_registry.confidence(cid)
+        fc_text = f"{fc_qty} {confidence}" if confidence else fc_qty
+
+        # Determine delivery status tag
+        if prov >= req:
+            status_tag = 'fullDelivery'  # Fully delivered
+        elif prov == 0:
+            status_tag = 'noDelivery'    # No deliveries yet
+        else:
+            status_tag = base_tag        # Partially delivered - use normal alternating colors
+        return (locName, req, prov, need, for_sale, fc_text, ship_qty, short), status_tag
+
+    def update_cargo_label(self):
+        total_cargo = get_total_ship_cargo()
+        self.cargo_label['text'] = f"Current Cargo: {total_cargo}/{self.cargo_capacity} tons"
+
+    def request_refresh(self, delay=REFRESH_DEBOUNCE_MS):
+        """Schedule a refresh, merging requests that arrive within the delay."""
+        if self.refresh_job is None:
+            self.refresh_job = self.after(delay, self._scheduled_refresh)
+
+    def _scheduled_refresh(self):
+        self.refresh_job = None
+        self.refresh()
+
+    def _update_summary_labels(self, site):
+        """Update the cargo, trips and completion labels."""
+        self.update_cargo_label()
+
         # Calculate and display estimated transport trips and completion percentage
-        required_trips = self.calculate_required_trips(materials)
-        completion_percentage = self.calculate_completion_percentage(materials)
+        required_trips = self.calculate_required_trips(site)
+        completion_percentage = self.calculate_completion_percentage(site)
         
         if required_trips > 0:
             self.transport_label['text'] = f"Est. trips: {required_trips} (based on {self.cargo_capacity} ton capacity) - Completion: {completion_percentage:.1f}%"
         else:
             self.transport_label['text'] = f"All materials delivered! - Completion: 100%"
 
+    def update_material_rows(self, site_id, cids):
+        """
+        Update only the given material rows of the displayed site.
+
+        Falls back to a full redraw when a row has to appear or disappear
+        (hide provided materials), since that shifts the alternating colors.
+
+        Args:
+            site_id: Site whose materials changed
+            cids (list): Commodity IDs that changed
+        """
+        if site_id != self.displayed_site and not (self.displayed_site is ALL_SITES and site_id in self.data):
+            return
+        site = self._site_record(self.displayed_site)
+        if site is None:
+            return
+        for cid in cids:
+            i = site.position(cid)
+            item = self.row_ids.get(cid)
+            visible = i is not None and not (self.hide_provided and site.provided[i] >= site.required[i])
+            if visible != (item is not None):
+                self.display_station()
+                return
+            if item is None:
+                continue
+            base_tag = self.tree.item(item, 'tags')[0]
+            values, status_tag = self._material_row(cid, site.required[i], site.provided[i], base_tag)
+            self.tree.item(item, values=values, tags=(base_tag, status_tag))
+        self._update_summary_labels(site)
+
 # --- Update Notification Dialog ---
 class UpdateNotificationDialog(tk.Toplevel):
     """Dialog that notifies user about available updates in Polish."""
@@ -1027,6 +1150,10 @@ class UpdateNotificationDialog(tk.Toplevel):
             x = (self.winfo_screenwidth() - self.winfo_width()) // 2
             y = (self.winfo_screenheight() - self.winfo_height()) // 2
         self.geometry(f"+{x}+{y}")
+        
+        # Use the parent's style set for the ttk widgets
+        if hasattr(parent, 'current_theme') and hasattr(parent, 'THEME_STYLE_PREFIX'):
+            apply_style_set(self, parent.THEME_STYLE_PREFIX[parent.current_theme])
     
     def open_settings(self):
         """Open the settings window to the Updates tab."""
@@ -1049,21 +1176,18 @@ class UpdateNotificationDialog(tk.Toplevel):
 
 # --- Plugin Hooks ---
 def show_gui():
-    global ARCHITECT_GUI
+    global ARCHITECT_GUI, startup_update_check_scheduled
     if not ARCHITECT_GUI or not ARCHITECT_GUI.winfo_exists():
         # Create new window with appropriate theme
         ARCHITECT_GUI = ArchitectTrackerGUI(None)
-        # Schedule update check after GUI is fully loaded
-        ARCHITECT_GUI.after(2000, check_for_updates_at_startup)
+        # Schedule update check after GUI is fully loaded (not again when the window is recreated)
+        if not startup_update_check_scheduled:
+            startup_update_check_scheduled = True
+            ARCHITECT_GUI.after(2000, check_for_updates_at_startup)
     else:
-        # Update existing window
+        # Bring the existing window forward; its styles and data are already up to date
+        ARCHITECT_GUI.deiconify()
         ARCHITECT_GUI.lift()
-        
-        # We no longer automatically follow EDMC theme changes - using fixed defaults instead
-        # Refresh the UI to ensure proper rendering
-        ARCHITECT_GUI.setStyle()
-        
-        ARCHITECT_GUI.refresh()
 
 def check_for_updates_at_startup():
     """Check for updates at startup and show notification if newer version is available."""
@@ -1150,6 +1274,14 @@ def plugin_start3(plugin_dir):
         # We'll handle the actual window opening in plugin_app
         logger.info("Window was open on last exit, will reopen")
     
+    # Archive sites that have not been updated for too long
+    construction_data.max_age_days = settings.get('auto_archive_days', DEFAULT_AUTO_ARCHIVE_DAYS)
+    archive_stale_sites()
+    
+    # Deliver bug reports queued in earlier sessions
+    if bug_report.pending_reports():
+        bug_report.start_outbox_sender()
+    
     return "Architect Tracker"
 
 
@@ -1188,9 +1320,12 @@ def plugin_stop():
         ARCHITECT_GUI.destroy()
 
 
+@diagnostics.timed("journal_entry")
 def journal_entry(cmdr, is_beta, system, station, entry, state):
     event = entry.get("event")
     logger.info("Event detected: %s", event)
+    diagnostics.count_event(event)
+    cargo_from_state = ship_cargo.update_state(state.get("Cargo") if state else None)
 
     if event == "ColonisationConstructionDepot":
         resources = entry.get("ResourcesRequired", [])
@@ -1198,29 +1333,67 @@ def journal_entry(cmdr, is_beta, system, station, entry, state):
                                    "RequiredAmount": r["RequiredAmount"],
                                    "ProvidedAmount": r["ProvidedAmount"]}
                      for r in resources}
-        save_facility_requirements(materials, station, system )
+        save_facility_requirements(materials, station, system, entry.get("MarketID"),
+                                   bool(entry.get("ConstructionComplete")))
+
+    elif event == "ColonisationContribution":
+        load_facility_requirements()
+        # Only the depot's own site (or a legacy one in this system); never a same-named site elsewhere
+        site_id = construction_data.resolve_market(entry.get("MarketID"), station, system)
+        contributions = entry.get("Contributions", [])
+        changed = construction_data.apply_contribution(site_id, contributions) if site_id is not None else []
+        if not cargo_from_state:
+            # EDMC has not updated its cargo for this delivery yet
+            for contribution in contributions:
+                if contribution.get("Name"):
+                    ship_cargo.remove(commodities.commodity_id(contribution["Name"]), contribution.get("Amount", 0))
+        if changed:
+            try:
+                construction_data.save()
+            except Exception as e:
+                logger.error("Error saving data: %s", e)
+            if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
+                if site_id in construction_data.snapshot.sites:
+                    ARCHITECT_GUI.update_material_rows(site_id, changed)
+                else:
+                    # The delivery completed the site and saving dropped it
+                    ARCHITECT_GUI.refresh()
 
     elif event == "Docked":
         logger.info(f"Docked at station: {station} in system: {system}")
+        # A carrier's station name is its callsign
+        carrier_registry.set_docked(station if entry.get("StationType") == "FleetCarrier" else None,
+                                    entry.get("MarketID"))
         
         # Check if this is a construction station we're tracking
-        data = load_facility_requirements()
-        
-        # Try to find the station in our tracking list
-        found_station = None
-        for station_key, info in data.items():
-            # Check if the current station matches any tracked station
-            if station and station.lower() in station_key.lower():
-                found_station = station_key
-                logger.info(f"Found matching construction station: {found_station}")
-                break
+        load_facility_requirements()
+        market_id = entry.get("MarketID")
+        if market_id is None:
+            found_station = construction_data.resolve(None, station)
+        else:
+            found_station = construction_data.resolve_market(market_id, station, system)
+        changed = False
+        if found_station is not None and market_id is not None and found_station != market_id:
+            # Tracked before MarketID keys; adopt the MarketID now
+            construction_data.rekey(found_station, market_id)
+            found_station = market_id
+            changed = True
+        if found_station is not None:
+            logger.info(f"Found matching construction station: {found_station!r}")
+            changed = construction_data.rename(found_station, station) or changed
+            changed = construction_data.touch(found_station) or changed
+            if changed:
+                try:
+                    construction_data.save()
+                except Exception as e:
+                    logger.error("Error saving data: %s", e)
         
         # Refresh the GUI and select the station if found
         if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
             ARCHITECT_GUI.refresh()
             
             # After refresh, try to select the station if we found it
-            if found_station:
+            if found_station is not None:
                 # Get the display name from the station_map
                 for display_name, full_key in ARCHITECT_GUI.station_map.items():
                     if full_key == found_station:
@@ -1229,31 +1402,89 @@ def journal_entry(cmdr, is_beta, system, station, entry, state):
                         ARCHITECT_GUI.display_station()
                         break
 
-    elif event in ("Market", "Cargo", "CollectCargo", "EjectCargo", "MarketBuy", "MarketSell", "MiningRefined", "MissionCompleted",
+    elif event in ("MarketBuy", "MarketSell"):
+        count = entry.get("Count", 0)
+        cid = market_model.apply_trade(entry.get("MarketID"), entry.get("Type"),
+                                       -count if event == "MarketBuy" else count)
+        # Trading at one of our carriers' markets also moves the carrier's stock
+        carrier_cid = carrier_registry.apply_market_trade(entry.get("MarketID"), event, entry.get("Type"), count)
+        if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
+            if cid is not None or carrier_cid is not None:
+                # Only the traded commodity's stock and ship/carrier cargo changed
+                ARCHITECT_GUI.update_material_rows(ARCHITECT_GUI.displayed_site, [cid if cid is not None else carrier_cid])
+            else:
+                market_model.reload()
+                ARCHITECT_GUI.refresh()
+
+    elif event in ("Market", "Cargo", "CollectCargo", "EjectCargo", "MiningRefined", "MissionCompleted",
                   "BuyDrones", "SellDrones", "FetchRemoteModule", "MissionAccepted", "RedeemVoucher", "CarrierBuy", "CarrierSell", 
                   "EngineerCraft", "ModuleBuy", "ModuleSell", "ModuleRetrieve", "ModuleStore",
                   "ApproachSettlement", "Location", "MarketData", "FSSDiscoveryScan"):
         logger.info(f"Market-related event detected: {event}. Refreshing GUI.")
+        ship_cargo.invalidate()
+        if event == "Location":
+            carrier_registry.set_docked(station if entry.get("Docked") and entry.get("StationType") == "FleetCarrier" else None,
+                                        entry.get("MarketID"))
+        if event == "Market":
+            market_model.reload()
         if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
             ARCHITECT_GUI.refresh()
 
+    elif event == "Undocked":
+        carrier_registry.set_docked(None)
+
+    elif event == "CarrierStats":
+        carrier_registry.remember_market(entry.get("CarrierID"), entry.get("Callsign"))
+
+    elif event == "CarrierTradeOrder":
+        cid = carrier_registry.apply_trade_order(entry)
+        if cid is not None and ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
+            # The order changes how far the row's carrier quantity can be trusted
+            ARCHITECT_GUI.update_material_rows(ARCHITECT_GUI.displayed_site, [cid])
+
     elif event == "CargoTransfer":
         transfers = entry.get("Transfers", [])
-        carrier_tracker.apply_transfer_event(transfers)
+        carrier_registry.apply_transfer_event(transfers)
+        ship_cargo.invalidate()
         if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
             ARCHITECT_GUI.refresh()
 
     elif event == "CargoDepot":
+        ship_cargo.invalidate()
         if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
             ARCHITECT_GUI.refresh()
 
 
 
+@diagnostics.timed("dashboard_entry")
+def dashboard_entry(cmdr, is_beta, entry):
+    # Called for every Status.json update (several per second): only compare, touch the GUI on change
+    cargo_changed, docked_changed = status_snapshot.update(entry)
+    if not (cargo_changed or docked_changed):
+        return
+    if docked_changed:
+        logger.info("Docked" if status_snapshot.docked else "Undocked")
+    # The window has no table until the first construction site is saved
+    if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists() and hasattr(ARCHITECT_GUI, 'tree'):
+        if cargo_changed:
+            ARCHITECT_GUI.update_cargo_label()
+        ARCHITECT_GUI.request_refresh()
+
+
+@diagnostics.timed("capi_fleetcarrier")
 def capi_fleetcarrier(data: CAPIData):
     logger.info("Received fleet carrier CAPI data")
-    carrier_tracker.update(data)
-    if ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists():
-        ARCHITECT_GUI.refresh()
+    callsign, deltas, confidence_changed = carrier_registry.update(data)
+    if not (ARCHITECT_GUI and ARCHITECT_GUI.winfo_exists() and hasattr(ARCHITECT_GUI, 'tree')):
+        return
+    ARCHITECT_GUI.carrier_label['text'] = carrier_label_text()
+    if not carrier_registry.is_selected(callsign):
+        return
+    # Only redraw rows of commodities some tracked site still needs
+    needed = needed_commodities()
+    changed = [cid for cid in set(deltas) | confidence_changed if cid in needed]
+    if changed:
+        ARCHITECT_GUI.update_material_rows(ARCHITECT_GUI.displayed_site, changed)
 
 
 
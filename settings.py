@@ -2,6 +2,7 @@ import json
 import os
 import logging
 import platform
+import tempfile
 from contextlib import suppress
 
 # Configure user directories
@@ -39,6 +40,26 @@ def save_gui_settings(settings: dict):
     except Exception as e:
         logger.error(f"Error saving GUI settings: {e}")
 
+def write_json_atomic(path: str, data, **dump_kwargs):
+    """
+    Write JSON to a temporary file and atomically replace the target with it.
+
+    The temporary file has a unique name, so EDMC instances sharing the user
+    directory never write into each other's file; the last replace wins.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                    prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
 def get_skipped_version():
     """Get the skipped version from settings."""
     settings = load_gui_settings()
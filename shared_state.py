@@ -0,0 +1,42 @@
+import threading
+from functools import wraps
+from types import MappingProxyType
+
+# Tracker state (construction sites, carrier cargo) is changed by EDMC hooks
+# and read from the Tk thread, the settings window and background threads.
+#
+# Writers change their private working copy while holding WRITE_LOCK, then
+# publish an immutable snapshot (read-only mappings of objects that are never
+# changed again) by replacing one attribute. Readers take that reference once
+# and use it without locking: they always see the state as it was after a
+# complete write, never one half applied.
+
+# Single lock serialising every writer of shared tracker state
+WRITE_LOCK = threading.RLock()
+
+EMPTY = MappingProxyType({})
+
+
+def freeze(mapping) -> MappingProxyType:
+    """Read-only copy of a dictionary."""
+    return MappingProxyType(dict(mapping))
+
+
+def writer(method):
+    """
+    Run a method under WRITE_LOCK and publish the object's snapshot when it returns.
+
+    Writers calling other writers publish once, when the outermost one finishes.
+    The object provides `_publish()` and starts with `_write_depth = 0`.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with WRITE_LOCK:
+            self._write_depth += 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._publish()
+    return wrapper
@@ -0,0 +1,96 @@
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import commodities
+from settings import USER_DIR
+
+# Configure logger
+logger = logging.getLogger("ArchitectTracker.Archive")
+
+# Finished (and otherwise retired) construction sites, one JSON record per line.
+# Every append adds a new gzip member, so the file is never rewritten; gzip
+# readers see the members as one continuous stream.
+ARCHIVE_FILE = os.path.join(USER_DIR, "construction_archive.jsonl.gz")
+
+
+def site_record(reason: str, site_id, site, when: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Build the archive record of a site.
+
+    Args:
+        reason (str): Why the site left the active set ("completed" or "stale")
+        site_id: The site's id in the construction store
+        site: construction_store.Site
+        when (float): Time of archiving (defaults to now)
+
+    Returns:
+        dict: JSON-serialisable record
+    """
+    finished = time.time() if when is None else when
+    return {
+        "reason": reason,
+        "site_id": site_id,
+        "name": site.name,
+        "system": site.system,
+        "started": site.created,
+        "last_updated": site.updated,
+        "finished": finished,
+        "duration": finished - site.created if site.created else None,
+        "total_tonnes": site.total_required(),
+        "provided_tonnes": site.total_provided(),
+        "commodities": [[commodities.symbol(cid), commodities.display_name(cid), required, provided]
+                        for cid, required, provided in site.rows()],
+    }
+
+
+def append(records: List[Dict[str, Any]], path: str = ARCHIVE_FILE):
+    """Append records to the archive as one new gzip member."""
+    if not records:
+        return
+    data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        f.write(data)
+
+
+def read_records(path: str = ARCHIVE_FILE) -> List[Dict[str, Any]]:
+    """
+    Read all archive records, oldest first.
+
+    A member cut short by a crash only loses its own records.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping damaged archive record")
+    except (EOFError, OSError) as e:
+        logger.error(f"Archive ends early ({e}), loaded {len(records)} records")
+    return records
+
+
+def latest_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Reduce the archive to the current state of each archived site, newest first.
+
+    Sites whose latest record is a restore are back in the active set and left out.
+    """
+    latest = {}
+    for record in records:
+        key = json.dumps(record.get("site_id"))  # keeps 123 and "123" apart
+        latest.pop(key, None)
+        latest[key] = record
+    return [r for r in reversed(list(latest.values())) if r.get("reason") != "restored"]
+
+
+def restored_record(site_id, name: str) -> Dict[str, Any]:
+    """Record marking an archived site as restored to the active set."""
+    return {"reason": "restored", "site_id": site_id, "name": name, "finished": time.time()}
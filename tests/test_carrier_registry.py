@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import commodities  # noqa: E402
+from carrier_registry import CarrierRegistry  # noqa: E402
+
+
+def test_first_sync_replaces_cargo_tracked_before_callsign_was_known(tmp_path):
+    registry = CarrierRegistry(str(tmp_path / "carriers"), str(tmp_path / "fleet_carrier_cargo.json"))
+    registry.load()
+    registry.apply_transfer_event([{"Type": "steel", "Count": 100, "Direction": "tocarrier"}])
+
+    registry.update({"name": {"callsign": "K7Q-BQL"}, "cargo": [{"commodity": "Steel", "qty": 100}]})
+
+    assert list(registry.carriers) == ["K7Q-BQL"]
+    assert registry.get_quantity(commodities.find("steel")) == 100
+    assert registry.snapshot.carriers["K7Q-BQL"].selected
@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import commodities  # noqa: E402
+from construction_store import ConstructionStore  # noqa: E402
+
+MATERIALS = {"steel": {"RequiredAmount": 100, "ProvidedAmount": 10}}
+
+
+def test_same_name_in_another_system_is_a_new_site(tmp_path):
+    store = ConstructionStore(str(tmp_path / "construction_requirements.json"))
+    store.load()
+    store.upsert(111, "$EXT_PANEL_ColonisationShip; Ahmed Hub", "Sol", MATERIALS)
+
+    site_id = store.upsert(222, "$EXT_PANEL_ColonisationShip; Ahmed Hub", "Lave", MATERIALS)
+
+    assert site_id == 222
+    assert set(store.sites) == {111, 222}
+    assert store.sites[111].system == "Sol"
+    assert store.sites[222].system == "Lave"
+
+
+def test_legacy_site_adopts_market_id_in_same_system(tmp_path):
+    store = ConstructionStore(str(tmp_path / "construction_requirements.json"))
+    store.load()
+    store.upsert(None, "Ahmed Hub", "Sol", MATERIALS)
+
+    assert store.resolve_market(222, "Ahmed Hub", "Lave") is None
+    assert store.upsert(111, "Ahmed Hub", "Sol", MATERIALS) == 111
+    assert set(store.sites) == {111}
+
+
+def test_contribution_at_untracked_depot_is_not_credited_to_same_named_site(tmp_path):
+    store = ConstructionStore(str(tmp_path / "construction_requirements.json"))
+    store.load()
+    store.upsert(111, "$EXT_PANEL_ColonisationShip; Ahmed Hub", "Sol", MATERIALS)
+
+    # What the ColonisationContribution handler does at MarketID 222 in Lave
+    site_id = store.resolve_market(222, "$EXT_PANEL_ColonisationShip; Ahmed Hub", "Lave")
+
+    assert site_id is None
+    assert store.apply_contribution(site_id, [{"Name": "steel", "Amount": 50}]) == []
+    assert list(store.sites[111].rows())[0][2] == 10
+
+def test_completed_sites_are_kept_if_archiving_fails(tmp_path):
+    archive = tmp_path / "archive.jsonl.gz"
+    archive.mkdir()  # appending to a directory fails
+    store = ConstructionStore(str(tmp_path / "construction_requirements.json"), str(archive))
+    store.load()
+    store.upsert(111, "Ahmed Hub", "Sol", {"steel": {"RequiredAmount": 100, "ProvidedAmount": 100}})
+
+    assert store.prune_completed() == []
+    assert 111 in store.sites
+
+
+def test_complete_sites_loaded_from_disk_are_not_published(tmp_path):
+    path = tmp_path / "construction_requirements.json"
+    path.write_text('{"version":5,"commodities":[["steel","Steel"]],'
+                    '"sites":[[111,"Done","Sol",[0,10,10],null,null],[222,"Open","Sol",[0,10,5],null,null]],'
+                    '"aliases":{}}', encoding="utf-8")
+    store = ConstructionStore(str(path))
+    store.load()
+
+    assert set(store.snapshot.sites) == {222}
+    assert store.aggregate([111, 222]).total_required() == 10
+    assert path.read_text(encoding="utf-8").count("Done") == 1  # nothing written on load
+
+
+def test_restore_keeps_a_site_that_is_tracked_again(tmp_path):
+    store = ConstructionStore(str(tmp_path / "construction_requirements.json"))
+    store.load()
+    store.upsert(111, "Ahmed Hub", "Sol", MATERIALS)
+    record = {"site_id": 111, "name": "Ahmed Hub", "system": "Sol", "commodities": [["steel", "Steel", 100, 0]]}
+
+    assert store.restore(record) is None
+    assert list(store.sites[111].rows())[0][2] == 10
+
+
+def test_upsert_keeps_localised_names(tmp_path):
+    store = ConstructionStore(str(tmp_path / "construction_requirements.json"))
+    store.load()
+    store.upsert(111, "Ahmed Hub", "Sol", {"$cmmcomposite_name;": {
+        "Name_Localised": "CMM Composite", "RequiredAmount": 10, "ProvidedAmount": 0}})
+
+    assert commodities.display_name(store.sites[111].ids[0]) == "CMM Composite"
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client  # noqa: E402
+import updater  # noqa: E402
+
+RELEASES = [{"name": "Release 1.9", "tag_name": "v1.9.0", "body": "",
+             "assets": [{"name": "ArchitectTracker.zip", "browser_download_url": "http://example/a.zip"}]}]
+ETAG = '"releases-1"'
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """Stand-in for the GitHub release list that honours If-None-Match."""
+    requests = []
+
+    def do_GET(self):
+        ReleaseHandler.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(RELEASES).encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def release_server():
+    ReleaseHandler.requests = []
+    server = HTTPServer(("127.0.0.1", 0), ReleaseHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_port}/releases"
+    server.shutdown()
+    server.server_close()
+
+
+def test_release_cache(release_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0)
+    server, url = release_server
+    cache_file = str(tmp_path / "release_cache.json")
+
+    # 200: the list and its ETag are cached
+    ok, releases = updater.get_available_releases(url, cache_file)
+    assert ok and releases[0]["version"] == "1.9.0"
+    assert ReleaseHandler.requests == [None]
+    with open(cache_file, encoding="utf-8") as f:
+        assert json.load(f)["etag"] == ETAG
+
+    # Within the TTL no request is sent
+    assert updater.get_available_releases(url, cache_file) == (True, releases)
+    assert len(ReleaseHandler.requests) == 1
+
+    # After the TTL a conditional request is answered with 304 and the cache reused
+    assert updater.get_available_releases(url, cache_file, ttl=0) == (True, releases)
+    assert ReleaseHandler.requests == [None, ETAG]
+
+    # Offline: the stale cache is returned instead of an error
+    server.shutdown()
+    server.server_close()
+    assert updater.get_available_releases(url, cache_file, ttl=0) == (True, releases)
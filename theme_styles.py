@@ -0,0 +1,82 @@
+from tkinter import ttk
+from typing import Dict
+
+# ttk widget classes that have a style in every theme style set
+STYLED_CLASSES = ("TButton", "TLabel", "TEntry", "TFrame", "TCheckbutton", "TRadiobutton", "Treeview")
+
+# Tk interpreter the style sets were built for
+_built_for = None
+
+
+def build_style_sets(theme_colors: Dict[int, Dict[str, str]], prefixes: Dict[int, str]):
+    """
+    Configure one named ttk style set per theme (e.g. Dark.TLabel, Light.Treeview).
+
+    The styles are built only once per Tk interpreter, so switching themes
+    afterwards only needs apply_style_set().
+
+    Args:
+        theme_colors (dict): Theme constant -> color scheme
+        prefixes (dict): Theme constant -> style name prefix
+    """
+    global _built_for
+    style = ttk.Style()
+    if _built_for is style.tk:
+        return
+    style.theme_use("default")
+
+    for theme, prefix in prefixes.items():
+        colors = theme_colors[theme]
+
+        # TreeView and its headings
+        style.configure(f"{prefix}.Treeview",
+                        background=colors["background"],
+                        foreground=colors["foreground"],
+                        rowheight=24,
+                        fieldbackground=colors["background"])
+        style.configure(f"{prefix}.Treeview.Heading",
+                        background=colors["background"],
+                        foreground=colors["foreground"])
+        style.map(f"{prefix}.Treeview",
+                  foreground=[("selected", colors["highlight"])])
+
+        style.configure(f"{prefix}.TButton",
+                        background=colors["button_bg"],
+                        foreground=colors["button_fg"])
+        style.map(f"{prefix}.TButton",
+                  background=[("active", colors["highlight"])],
+                  foreground=[("active", colors["button_fg"])])
+
+        style.configure(f"{prefix}.TLabel",
+                        background=colors["background"],
+                        foreground=colors["label_fg"])
+
+        style.configure(f"{prefix}.TEntry",
+                        fieldbackground=colors["background"],
+                        foreground=colors["foreground"])
+        style.map(f"{prefix}.TEntry",
+                  fieldbackground=[("active", colors["background"])])
+
+        style.configure(f"{prefix}.TFrame",
+                        background=colors["background"])
+
+        for cls in ("TCheckbutton", "TRadiobutton"):
+            style.configure(f"{prefix}.{cls}",
+                            background=colors["background"],
+                            foreground=colors["foreground"])
+            style.map(f"{prefix}.{cls}",
+                      background=[("active", colors["background"])],
+                      foreground=[("active", colors["highlight"])])
+
+    _built_for = style.tk
+
+
+def apply_style_set(widget, prefix: str):
+    """Point a widget and all its ttk descendants at the given style set."""
+    pending = [widget]
+    while pending:
+        current = pending.pop()
+        cls = current.winfo_class()
+        if cls in STYLED_CLASSES:
+            current.configure(style=f"{prefix}.{cls}")
+        pending.extend(current.winfo_children())
@@ -5,12 +5,18 @@ import logging
 import tkinter as tk
 from tkinter import ttk, messagebox
 import requests
+import urllib3
 import zipfile
 import shutil
 import re
+import time
+import hashlib
 from contextlib import suppress
 import threading
 
+from settings import USER_DIR, write_json_atomic
+import http_client
+
 # Configure logger
 logger = logging.getLogger("ArchitectTracker.Updater")
 
@@ -18,7 +24,27 @@ logger = logging.getLogger("ArchitectTracker.Updater")
 CURRENT_VERSION = "1.8.2"
 GITHUB_API_URL = "https://api.github.com/repos/kol19pl/EliteDangerous-ArchictectTracker/releases"
 GITHUB_RELEASES_URL = "https://github.com/kol19pl/EliteDangerous-ArchictectTracker/releases"
-TEMP_DOWNLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_download")
+# Kept in USER_DIR so a partial download survives restarts and plugin updates
+TEMP_DOWNLOAD_DIR = os.path.join(USER_DIR, "temp_download")
+
+# Download tuning
+DOWNLOAD_TIMEOUT = (10, 30)  # (connect, read) seconds
+DOWNLOAD_ATTEMPTS = 5
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.25  # minimum seconds between progress callbacks
+
+# Release manifest (relative path -> SHA-256) written into the installed plugin directory
+MANIFEST_FILE = "manifest.json"
+# Entries in the plugin directory that never belong to a release
+MANIFEST_EXCLUDE = {"__pycache__", ".git", ".idea", "temp_download", "backup", MANIFEST_FILE}
+# Excluded entries that belong to the user and are moved into the new version on update
+PRESERVED_ENTRIES = MANIFEST_EXCLUDE - {"__pycache__", "temp_download", MANIFEST_FILE}
+
+# Cached GitHub release list (shared by all EDMC instances of this user)
+RELEASE_CACHE_FILE = os.path.join(USER_DIR, "release_cache.json")
+RELEASE_CACHE_TTL = 6 * 60 * 60  # seconds before the cached list is revalidated
+RELEASE_CACHE_FORMAT = 2  # bump when the formatted release fields change
 
 def parse_version(version_str):
     """
@@ -41,55 +67,145 @@ def parse_version(version_str):
         # If conversion fails, return a tuple that will compare lower than any valid version
         return (0,)
 
-def get_available_releases():
+def _format_releases(releases):
+    """
+    Convert the GitHub API release list into the format used by the plugin.
+    
+    Args:
+        releases (list): Release objects from the GitHub API
+        
+    Returns:
+        list: Formatted releases sorted by version (descending)
+    """
+    formatted_releases = []
+    for release in releases:
+        release_name = (release.get('name') or '').strip()
+        tag_name = (release.get('tag_name') or '').strip()
+        
+        # Extract version from tag_name (v1.7 -> 1.7)
+        version_match = re.search(r'v?(\d+\.\d+(?:\.\d+)?)', tag_name)
+        version_str = version_match.group(1) if version_match else tag_name
+        
+        # Get asset download URL, size and digest (used to verify the download)
+        assets = release.get('assets', [])
+        download_url = None
+        download_size = None
+        download_digest = None
+        for asset in assets:
+            if asset.get('name', '').endswith('.zip'):
+                download_url = asset.get('browser_download_url')
+                download_size = asset.get('size')
+                download_digest = asset.get('digest')
+                break
+        
+        if download_url:
+            formatted_releases.append({
+                'version': version_str,
+                'name': release_name,
+                'tag': tag_name,
+                'download_url': download_url,
+                'size': download_size,
+                'digest': download_digest,
+                'published_at': release.get('published_at', ''),
+                'description': release.get('body', '')
+            })
+    
+    # Sort releases by version (descending)
+    formatted_releases.sort(key=lambda x: parse_version(x['version']), reverse=True)
+    return formatted_releases
+
+def _load_release_cache(cache_file, api_url):
+    """
+    Load the cached release list for the given API URL.
+    
+    Returns:
+        dict: Cache entry, or an empty dict if there is no usable cache
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable release cache: {e}")
+        return {}
+    
+    if (not isinstance(cache, dict) or cache.get('format') != RELEASE_CACHE_FORMAT
+            or cache.get('url') != api_url or not isinstance(cache.get('releases'), list)):
+        return {}
+    return cache
+
+def _save_release_cache(cache_file, cache):
+    """Persist the release cache, logging (not raising) on failure."""
+    try:
+        write_json_atomic(cache_file, cache)
+    except Exception as e:
+        logger.warning(f"Failed to save release cache: {e}")
+
+def get_available_releases(api_url=GITHUB_API_URL, cache_file=RELEASE_CACHE_FILE,
+                           ttl=RELEASE_CACHE_TTL, force_revalidate=False):
     """
     Fetch available releases from GitHub API.
     
+    The parsed list is cached in USER_DIR together with the ETag and
+    Last-Modified headers. Within the TTL the cached list is returned without
+    any request; after it, a conditional request is sent and a 304 reply
+    reuses the cached list. If GitHub cannot be reached (or rate limits us),
+    a previously cached list is returned instead of an error.
+    
+    Args:
+        api_url (str): Release list URL (overridable for testing)
+        cache_file (str): Path of the release cache file
+        ttl (int): Seconds the cached list is used without revalidation
+        force_revalidate (bool): Skip the TTL and always revalidate
+        
     Returns:
         tuple: (success flag, list of releases or error message)
     """
+    cache = _load_release_cache(cache_file, api_url)
+    now = time.time()
+    
+    if cache and not force_revalidate and now - cache.get('fetched_at', 0) < ttl:
+        logger.info("Using cached release list")
+        return True, cache['releases']
+    
+    headers = {"Accept": "application/vnd.github+json"}
+    if cache.get('etag'):
+        headers["If-None-Match"] = cache['etag']
+    if cache.get('last_modified'):
+        headers["If-Modified-Since"] = cache['last_modified']
+    
     try:
-        response = requests.get(GITHUB_API_URL, timeout=10)
+        response = http_client.get(api_url, headers=headers)
+        
+        if response.status_code == 304 and cache:
+            logger.info("Release list not modified, reusing cache")
+            cache['fetched_at'] = now
+            _save_release_cache(cache_file, cache)
+            return True, cache['releases']
+        
         response.raise_for_status()
         
         releases = response.json()
         if not releases:
             return False, "No releases found"
         
-        # Format releases for display
-        formatted_releases = []
-        for release in releases:
-            release_name = release.get('name', '').strip()
-            tag_name = release.get('tag_name', '').strip()
-            
-            # Extract version from tag_name (v1.7 -> 1.7)
-            version_match = re.search(r'v?(\d+\.\d+(?:\.\d+)?)', tag_name)
-            version_str = version_match.group(1) if version_match else tag_name
-            
-            # Get asset download URL
-            assets = release.get('assets', [])
-            download_url = None
-            for asset in assets:
-                if asset.get('name', '').endswith('.zip'):
-                    download_url = asset.get('browser_download_url')
-                    break
-            
-            if download_url:
-                formatted_releases.append({
-                    'version': version_str,
-                    'name': release_name,
-                    'tag': tag_name,
-                    'download_url': download_url,
-                    'published_at': release.get('published_at', ''),
-                    'description': release.get('body', '')
-                })
-        
-        # Sort releases by version (descending)
-        formatted_releases.sort(key=lambda x: parse_version(x['version']), reverse=True)
+        formatted_releases = _format_releases(releases)
+        _save_release_cache(cache_file, {
+            'format': RELEASE_CACHE_FORMAT,
+            'url': api_url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': now,
+            'releases': formatted_releases
+        })
         return True, formatted_releases
     
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to fetch releases: {e}")
+        if cache:
+            logger.info("Falling back to cached release list")
+            return True, cache['releases']
         return False, f"Failed to fetch releases: {e}"
     except Exception as e:
         logger.error(f"Error processing releases: {e}")
@@ -115,6 +231,306 @@ def is_newer_version(current, target):
         # If parsing fails, fall back to string comparison
         return target > current
 
+def _throttle_progress(progress_callback, interval=PROGRESS_INTERVAL):
+    """
+    Wrap a progress callback so it is called at most once per interval.
+    
+    Args:
+        progress_callback (callable): Function taking (progress, message)
+        interval (float): Minimum seconds between calls
+        
+    Returns:
+        callable: Wrapper taking (progress, message, force=False); forced
+        calls (stage changes, errors) are always passed through
+    """
+    last_call = [0.0]
+    
+    def _report(progress, message, force=False):
+        if not progress_callback:
+            return
+        now = time.monotonic()
+        if force or now - last_call[0] >= interval:
+            last_call[0] = now
+            progress_callback(progress, message)
+    
+    return _report
+
+def _download_file(url, dest_path, report, expected_size=None, attempts=DOWNLOAD_ATTEMPTS):
+    """
+    Download a file into dest_path, resuming from a .part file with HTTP Range.
+    
+    The chunk size adapts to the connection speed. Failed attempts keep the
+    data received so far and continue from there after a short backoff.
+    
+    Args:
+        url (str): Download URL
+        dest_path (str): Final file path
+        report (callable): Throttled progress function (progress, message, force)
+        expected_size (int): Size from the release metadata, if known
+        attempts (int): Maximum number of connection attempts
+    """
+    part_path = dest_path + ".part"
+    progress = 0
+    
+    for attempt in range(1, attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if expected_size and offset > expected_size:
+            # Leftover from a different file; start again
+            os.remove(part_path)
+            offset = 0
+        if expected_size and offset == expected_size:
+            break
+        
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            # Resuming is the only retry layer here; http_client must not retry as well
+            with http_client.get(url, stream=True, headers=headers, timeout=DOWNLOAD_TIMEOUT, retries=0) as response:
+                if response.status_code == 416:
+                    # Nothing left to fetch past our offset; verification decides if it is complete
+                    break
+                response.raise_for_status()
+                
+                if response.status_code != 206:
+                    # Server ignored the range request; start over
+                    offset = 0
+                content_length = int(response.headers.get('content-length', 0))
+                total_size = expected_size or (offset + content_length if content_length else 0)
+                
+                if offset:
+                    logger.info(f"Resuming download at {offset} bytes (attempt {attempt})")
+                
+                downloaded_size = offset
+                chunk_size = 64 * 1024
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    while True:
+                        started = time.monotonic()
+                        chunk = response.raw.read(chunk_size, decode_content=True)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        downloaded_size += len(chunk)
+                        
+                        # Grow the chunk size on fast reads, shrink it on slow ones
+                        elapsed = time.monotonic() - started
+                        if elapsed < 0.1 and len(chunk) == chunk_size:
+                            chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+                        elif elapsed > 0.5:
+                            chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
+                        
+                        if total_size > 0:
+                            progress = int((downloaded_size / total_size) * 50)  # 0-50% for download
+                            report(progress, f"Downloading: {downloaded_size/1024/1024:.1f}MB / {total_size/1024/1024:.1f}MB")
+                
+                if total_size and downloaded_size < total_size:
+                    raise IOError(f"Connection closed after {downloaded_size} of {total_size} bytes")
+                break
+        
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, IOError) as e:
+            if attempt == attempts:
+                raise
+            delay = min(2 ** attempt, 30)
+            logger.warning(f"Download interrupted ({e}), retrying in {delay}s")
+            report(progress, f"Download interrupted, resuming in {delay}s...", force=True)
+            time.sleep(delay)
+    
+    os.replace(part_path, dest_path)
+
+def _verify_archive(zip_path, release):
+    """
+    Check a downloaded release archive before it is installed.
+    
+    Compares the size and SHA-256 digest with the release metadata (when
+    GitHub provides them) and tests the CRC of every member of the zip.
+    
+    Raises:
+        ValueError: If the archive is incomplete or corrupt
+    """
+    expected_size = release.get('size')
+    actual_size = os.path.getsize(zip_path)
+    if expected_size and actual_size != expected_size:
+        raise ValueError(f"Downloaded size {actual_size} does not match expected {expected_size} bytes")
+    
+    digest = release.get('digest') or ''
+    if digest.startswith('sha256:'):
+        sha256 = hashlib.sha256()
+        with open(zip_path, 'rb') as f:
+            for block in iter(lambda: f.read(MAX_CHUNK_SIZE), b''):
+                sha256.update(block)
+        if sha256.hexdigest() != digest.split(':', 1)[1].lower():
+            raise ValueError("Downloaded archive does not match the release checksum")
+    
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            bad_member = zip_ref.testzip()
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Downloaded archive is not a valid zip file: {e}")
+    if bad_member:
+        raise ValueError(f"Downloaded archive is corrupt (bad CRC in {bad_member})")
+
+def _file_sha256(path):
+    """Return the SHA-256 hex digest of a file."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(MAX_CHUNK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def build_manifest(root):
+    """
+    Hash every file under a directory.
+    
+    Args:
+        root (str): Directory to scan
+        
+    Returns:
+        dict: Relative POSIX path -> SHA-256 hex digest (excluded entries skipped)
+    """
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in MANIFEST_EXCLUDE]
+        for filename in filenames:
+            if filename in MANIFEST_EXCLUDE or filename.endswith(('.pyc', '.tmp')):
+                continue
+            full_path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+            manifest[rel_path] = _file_sha256(full_path)
+    return manifest
+
+def _read_manifest_file(directory):
+    """Return the manifest.json stored in a directory, or None if there is none."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest.get('files') if isinstance(manifest, dict) else None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+        return None
+
+def _stage_file(src_path, dst_path, link=False):
+    """Place a file in the staging directory, hard-linking unchanged files where possible."""
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    if link:
+        try:
+            os.link(src_path, dst_path)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src_path, dst_path)
+
+def _move_preserved_entries(old_dir, plugin_dir):
+    """
+    Move the user's excluded entries (a git checkout, backups) from the replaced directory into the new one.
+
+    Returns:
+        bool: True if nothing is left behind in old_dir
+    """
+    moved_all = True
+    for entry in PRESERVED_ENTRIES:
+        src = os.path.join(old_dir, entry)
+        if not os.path.lexists(src):
+            continue
+        dst = os.path.join(plugin_dir, entry)
+        if os.path.lexists(dst):
+            logger.error(f"Not moving {entry}: it already exists in {plugin_dir}, kept in {old_dir}")
+            moved_all = False
+            continue
+        try:
+            os.rename(src, dst)
+        except OSError as e:
+            logger.error(f"Could not move {entry} into the updated plugin, kept in {old_dir}: {e}")
+            moved_all = False
+    return moved_all
+
+def install_release_files(source_dir, plugin_dir, version_str):
+    """
+    Install extracted release files with a staged, atomic directory swap.
+    
+    The new version is assembled in a hidden sibling directory: files whose
+    hash matches the installed copy are hard-linked (or copied if linking is
+    not possible), only changed files are written from the release. Files
+    that are not part of the previous release (user files) are carried over.
+    The staged directory then replaces the plugin directory with two renames,
+    and any failure rolls back to the previous version. Excluded entries that
+    belong to the user (PRESERVED_ENTRIES, e.g. a git checkout) are moved
+    across before the old directory is deleted.
+    
+    Args:
+        source_dir (str): Directory containing the extracted release
+        plugin_dir (str): Installed plugin directory
+        version_str (str): Version being installed (recorded in the manifest)
+        
+    Returns:
+        int: Number of files that changed
+    """
+    parent_dir, name = os.path.split(os.path.normpath(plugin_dir))
+    # Leading dot: EDMC does not load these directories as plugins
+    staging_dir = os.path.join(parent_dir, f".{name}.staging")
+    old_dir = os.path.join(parent_dir, f".{name}.old")
+    
+    # Leftover of an earlier update; delete it only once nothing of the user's is left in it
+    if os.path.exists(old_dir) and _move_preserved_entries(old_dir, plugin_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    
+    new_manifest = build_manifest(source_dir)
+    shipped_manifest = _read_manifest_file(source_dir)
+    if shipped_manifest is not None and shipped_manifest != new_manifest:
+        raise ValueError("Release files do not match the release manifest")
+    
+    current_manifest = build_manifest(plugin_dir)
+    previous_release = _read_manifest_file(plugin_dir)
+    
+    changed = [path for path, digest in new_manifest.items() if current_manifest.get(path) != digest]
+    if previous_release is None:
+        # Without a previous manifest we cannot tell release files from user files; keep them all
+        removed = []
+    else:
+        removed = [path for path in current_manifest if path not in new_manifest and path in previous_release]
+    
+    if not changed and not removed:
+        logger.info(f"Plugin files already match version {version_str}, nothing to install")
+        return 0
+    
+    try:
+        for path in new_manifest:
+            if path in changed:
+                _stage_file(os.path.join(source_dir, path), os.path.join(staging_dir, path))
+            else:
+                _stage_file(os.path.join(plugin_dir, path), os.path.join(staging_dir, path), link=True)
+        
+        # Carry over files that are not part of any release
+        for path in current_manifest:
+            if path not in new_manifest and path not in removed:
+                _stage_file(os.path.join(plugin_dir, path), os.path.join(staging_dir, path), link=True)
+        
+        write_json_atomic(os.path.join(staging_dir, MANIFEST_FILE),
+                          {"version": version_str, "files": new_manifest}, indent=4)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    
+    # Swap the directories; roll back if the second rename fails
+    try:
+        os.rename(plugin_dir, old_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    try:
+        os.rename(staging_dir, plugin_dir)
+    except Exception:
+        os.rename(old_dir, plugin_dir)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    
+    if _move_preserved_entries(old_dir, plugin_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(f"Installed version {version_str}: {len(changed)} changed, {len(removed)} removed files")
+    return len(changed)
+
 def download_and_install_update(release, progress_callback=None, completion_callback=None):
     """
     Download and install the selected release.
@@ -126,41 +542,37 @@ def download_and_install_update(release, progress_callback=None, completion_call
     """
     def _update_worker():
         try:
-            # Ensure temp directory exists and is empty
-            if os.path.exists(TEMP_DOWNLOAD_DIR):
-                shutil.rmtree(TEMP_DOWNLOAD_DIR)
+            # Keep the temp directory so an interrupted download can be resumed
             os.makedirs(TEMP_DOWNLOAD_DIR, exist_ok=True)
             
             download_url = release['download_url']
             version_str = release['version']
             zip_path = os.path.join(TEMP_DOWNLOAD_DIR, f"architect_tracker_v{version_str}.zip")
+            report = _throttle_progress(progress_callback)
             
             # Report starting download
-            if progress_callback:
-                progress_callback(0, f"Downloading version {version_str}...")
+            report(0, f"Downloading version {version_str}...", force=True)
             
-            # Download the release zip file
-            response = requests.get(download_url, stream=True)
-            response.raise_for_status()
+            # Download the release zip file (resumes a previous .part file)
+            if not os.path.exists(zip_path):
+                _download_file(download_url, zip_path, report, expected_size=release.get('size'))
             
-            # Get file size for progress reporting
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-            
-            with open(zip_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if progress_callback and total_size > 0:
-                            progress = int((downloaded_size / total_size) * 50)  # 0-50% for download
-                            progress_callback(progress, f"Downloading: {downloaded_size/1024/1024:.1f}MB / {total_size/1024/1024:.1f}MB")
+            # Verify the archive before touching the plugin directory
+            report(50, "Download complete. Verifying archive...", force=True)
+            try:
+                _verify_archive(zip_path, release)
+            except ValueError:
+                # Do not resume from a corrupt file next time
+                os.remove(zip_path)
+                raise
             
             if progress_callback:
-                progress_callback(50, "Download complete. Extracting files...")
+                progress_callback(50, "Archive verified. Extracting files...")
             
             # Extract the zip file
             extract_dir = os.path.join(TEMP_DOWNLOAD_DIR, "extracted")
+            if os.path.exists(extract_dir):
+                shutil.rmtree(extract_dir)
             os.makedirs(extract_dir, exist_ok=True)
             
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
@@ -172,24 +584,6 @@ def download_and_install_update(release, progress_callback=None, completion_call
             # Determine the plugin directory
             plugin_dir = os.path.dirname(os.path.abspath(__file__))
             
-            # Backup current version - save essential user data
-            backup_dir = os.path.join(plugin_dir, "backup")
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Files to preserve (settings, saved stations, etc.)
-            preserve_files = [
-                "construction_requirements.json",
-                "settings.json",
-                "fleet_carrier_cargo.json",
-                "EDMC_Architect_Log.txt"
-            ]
-            
-            # Backup preserved files
-            for filename in preserve_files:
-                src_path = os.path.join(plugin_dir, filename)
-                if os.path.exists(src_path):
-                    shutil.copy2(src_path, os.path.join(backup_dir, filename))
-            
             # Find the extracted plugin directory
             # This assumes the zip contains a directory with the plugin files
             extracted_contents = os.listdir(extract_dir)
@@ -199,40 +593,14 @@ def download_and_install_update(release, progress_callback=None, completion_call
             if len(extracted_contents) == 1 and os.path.isdir(os.path.join(extract_dir, extracted_contents[0])):
                 source_dir = os.path.join(extract_dir, extracted_contents[0])
             
-            # Copy new files to plugin directory
-            for item in os.listdir(source_dir):
-                src_path = os.path.join(source_dir, item)
-                dst_path = os.path.join(plugin_dir, item)
-                
-                # Skip preserved files
-                if item in preserve_files:
-                    continue
-                
-                # Remove existing files/dirs before copying
-                if os.path.exists(dst_path):
-                    if os.path.isdir(dst_path):
-                        shutil.rmtree(dst_path)
-                    else:
-                        os.remove(dst_path)
-                
-                # Copy the new file/directory
-                if os.path.isdir(src_path):
-                    shutil.copytree(src_path, dst_path)
-                else:
-                    shutil.copy2(src_path, dst_path)
-            
-            # Restore preserved files
-            for filename in preserve_files:
-                backup_path = os.path.join(backup_dir, filename)
-                if os.path.exists(backup_path):
-                    shutil.copy2(backup_path, os.path.join(plugin_dir, filename))
+            # Stage the changed files next to the plugin and swap it in (rolls back on failure)
+            changed_count = install_release_files(source_dir, plugin_dir, version_str)
             
             if progress_callback:
-                progress_callback(90, "Cleaning up temporary files...")
+                progress_callback(90, f"Installed {changed_count} changed files. Cleaning up temporary files...")
             
             # Clean up
-            shutil.rmtree(TEMP_DOWNLOAD_DIR)
-            shutil.rmtree(backup_dir)
+            shutil.rmtree(TEMP_DOWNLOAD_DIR, ignore_errors=True)
             
             if progress_callback:
                 progress_callback(100, f"Update to version {version_str} complete! Please restart EDMC to apply the update.")